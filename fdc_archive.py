@@ -0,0 +1,185 @@
+# fdc_archive.py
+# Long-term SQLite archive of GUI test reports and alarm events, written off the UI thread.
+import datetime
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = 'fdc_archive.db'
+BATCH_SIZE = 500  # Rows per transaction at most
+FLUSH_INTERVAL = 1.0  # Seconds a queued row may wait for more to batch with
+PAGE_SIZE = 10  # Reports per page of the reports view
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    time TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_time ON reports (time, id);
+CREATE INDEX IF NOT EXISTS reports_status ON reports (status, time, id);
+CREATE TABLE IF NOT EXISTS report_zones (
+    report_id INTEGER NOT NULL,
+    zone INTEGER NOT NULL,
+    actions TEXT NOT NULL,
+    PRIMARY KEY (report_id, zone)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS report_zones_zone ON report_zones (zone, report_id);
+CREATE TABLE IF NOT EXISTS alarm_events (
+    id INTEGER PRIMARY KEY,
+    time TEXT NOT NULL,
+    zone INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alarm_events_time ON alarm_events (time, id);
+CREATE INDEX IF NOT EXISTS alarm_events_zone ON alarm_events (zone, time, id);
+CREATE INDEX IF NOT EXISTS alarm_events_type ON alarm_events (type, time, id);
+"""
+
+def _time_str(ts):
+    return ts.isoformat() if isinstance(ts, datetime.datetime) else str(ts)
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')  # Readers on the UI thread never wait for a batch commit
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+class Archive:
+    """
+    Test reports (one row each, plus one row per zone) and alarm events in SQLite, indexed by
+    time, zone and status. add_report/add_alarm only queue the row; a writer thread commits
+    queued rows in batches. Queries page with keyset cursors, newest first, and open one
+    connection per calling thread.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        conn = _connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def add_report(self, report):
+        """Queues a test report: {'timestamp', 'status', 'zones': {zone: [actions]}}"""
+        zones = [(zone, json.dumps(actions)) for zone, actions in report['zones'].items()]
+        self._queue.put(('report', _time_str(report['timestamp']), report['status'], zones))
+
+    def add_alarm(self, ts, zone, alarm_type, message):
+        self._queue.put(('alarm', _time_str(ts), zone, alarm_type, message))
+
+    def flush(self, timeout=None):
+        """Blocks until everything queued so far is committed"""
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        return done.wait(timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+
+    def _write_loop(self):
+        conn = _connect(self.path)
+        try:
+            while True:
+                item = self._queue.get()
+                batch = [item]
+                # Take whatever else arrives within the flush interval, up to a batch
+                deadline = time.monotonic() + self.flush_interval
+                while item is not None and item[0] != 'flush' and len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                self._write_batch(conn, batch)
+                if batch[-1] is None:
+                    return
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn, batch):
+        with conn:
+            for item in batch:
+                if item is None or item[0] == 'flush':
+                    continue
+                if item[0] == 'report':
+                    _, ts, status, zones = item
+                    report_id = conn.execute('INSERT INTO reports (time, status) VALUES (?, ?)', (ts, status)).lastrowid
+                    conn.executemany('INSERT INTO report_zones (report_id, zone, actions) VALUES (?, ?, ?)',
+                                     [(report_id, zone, actions) for zone, actions in zones])
+                else:
+                    conn.execute('INSERT INTO alarm_events (time, zone, type, message) VALUES (?, ?, ?, ?)', item[1:])
+        for item in batch:
+            if item is not None and item[0] == 'flush':
+                item[1].set()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    @staticmethod
+    def _filters(column_filters, since, until, before):
+        where, args = [], []
+        for clause, value in column_filters:
+            if value is not None:
+                where.append(clause)
+                args.append(value)
+        if since is not None:
+            where.append('time >= ?')
+            args.append(_time_str(since))
+        if until is not None:
+            where.append('time <= ?')
+            args.append(_time_str(until))
+        if before is not None:
+            where.append('(time, id) < (?, ?)')
+            args.extend(before)
+        return (' WHERE ' + ' AND '.join(where)) if where else '', args
+
+    def reports(self, limit=PAGE_SIZE, status=None, zone=None, since=None, until=None, before=None):
+        """
+        A page of reports, newest first, as [{'id', 'timestamp', 'status', 'zones'}]. Pass
+        before=cursor(last report of the previous page) for the next page.
+        """
+        zone_filter = 'id IN (SELECT report_id FROM report_zones WHERE zone = ?)'
+        where, args = self._filters([('status = ?', status), (zone_filter, zone)], since, until, before)
+        conn = self._conn()
+        rows = conn.execute(f'SELECT id, time, status FROM reports{where} ORDER BY time DESC, id DESC LIMIT ?',
+                            args + [limit]).fetchall()
+        reports = {row[0]: {'id': row[0], 'timestamp': datetime.datetime.fromisoformat(row[1]),
+                            'status': row[2], 'zones': {}} for row in rows}
+        if reports:
+            marks = ','.join('?' * len(reports))
+            for report_id, zone, actions in conn.execute(
+                    f'SELECT report_id, zone, actions FROM report_zones WHERE report_id IN ({marks}) ORDER BY report_id, zone',
+                    list(reports)):
+                reports[report_id]['zones'][zone] = json.loads(actions)
+        return [reports[row[0]] for row in rows]
+
+    def count_reports(self, status=None, zone=None, since=None, until=None):
+        zone_filter = 'id IN (SELECT report_id FROM report_zones WHERE zone = ?)'
+        where, args = self._filters([('status = ?', status), (zone_filter, zone)], since, until, None)
+        return self._conn().execute(f'SELECT COUNT(*) FROM reports{where}', args).fetchone()[0]
+
+    def alarms(self, limit=100, zone=None, alarm_type=None, since=None, until=None, before=None):
+        """A page of alarm events, newest first, as [{'id', 'timestamp', 'zone', 'type', 'message'}]"""
+        where, args = self._filters([('zone = ?', zone), ('type = ?', alarm_type)], since, until, before)
+        rows = self._conn().execute(
+            f'SELECT id, time, zone, type, message FROM alarm_events{where} ORDER BY time DESC, id DESC LIMIT ?',
+            args + [limit]).fetchall()
+        return [{'id': id, 'timestamp': datetime.datetime.fromisoformat(ts), 'zone': zone, 'type': alarm_type,
+                 'message': message} for id, ts, zone, alarm_type, message in rows]
+
+def cursor(row):
+    """Keyset cursor after a report or alarm row, for the before= argument of the next page"""
+    return _time_str(row['timestamp']), row['id']
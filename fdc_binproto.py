@@ -0,0 +1,253 @@
+# fdc_binproto.py
+# Length-prefixed binary command protocol for the simulator, for harnesses that need more than the text protocol.
+import calendar
+import contextlib
+import io
+import json
+import struct
+import time
+
+# Frame: length of what follows (uint32), request id (uint32), opcode (uint8), status (uint8), payload.
+# Responses echo the request id and opcode; status is 0 on success. All fields are little-endian.
+HEADER = struct.Struct('<IIBB')
+LENGTH = struct.Struct('<I')
+BODY_OFFSET = HEADER.size
+MAX_FRAME = 1 << 20
+
+OP_READ_REGS = 1  # payload: start, count (uint16 each) -> count int32 register values
+OP_WRITE_REGS = 2  # payload: start, count, then count int32 values -> empty
+OP_TRIGGER = 3  # payload: alarm type (uint8, index into ALARM_TYPES), zone (uint16) -> empty
+OP_RESET = 4  # payload: zone (uint16, 0 = all zones) -> empty
+OP_ADVANCE = 5  # payload: seconds (uint32) -> empty
+OP_STATUS = 6  # empty -> STATUS_HEAD, then STATUS_ZONE per zone
+
+STATUS_OK = 0
+STATUS_BAD_REQUEST = 1
+STATUS_UNKNOWN_OPCODE = 2
+STATUS_FAILED = 3
+
+ALARM_TYPES = ('smoke', 'thermal', 'external')
+LED_CODES = {'OFF': 0, 'ON': 1, 'FLASH': 2}
+BLOCK = struct.Struct('<HH')
+VALUE = struct.Struct('<i')
+TRIGGER = struct.Struct('<BH')
+ZONE = struct.Struct('<H')
+SECONDS = struct.Struct('<I')
+# version, powered, external alarm, relay closed, LED, fault LED, analog out (V), RTC (epoch s), zone count
+STATUS_HEAD = struct.Struct('<QBBBBBfqH')
+# zone, damper open, alarm bits (1 active, 2 smoke, 4 thermal), temperature
+STATUS_ZONE = struct.Struct('<HBBf')
+CLIENT = 'binary'  # Comm watchdog client name of register reads and writes over this protocol
+
+def encode(buf, request_id, opcode, payload=None, *values, status=STATUS_OK):
+    """Packs a frame into buf (a bytearray of at least the frame size); returns the frame length"""
+    size = payload.size if payload else 0
+    HEADER.pack_into(buf, 0, HEADER.size - LENGTH.size + size, request_id, opcode, status)
+    if payload:
+        payload.pack_into(buf, BODY_OFFSET, *values)
+    return BODY_OFFSET + size
+
+def encode_values(buf, offset, values):
+    """Appends int32 values at offset, for write payloads; returns the new end"""
+    for value in values:
+        VALUE.pack_into(buf, offset, value)
+        offset += VALUE.size
+    return offset
+
+def finish(buf, end):
+    """Sets the length field of a frame whose payload was packed by hand up to end"""
+    LENGTH.pack_into(buf, 0, end - LENGTH.size)
+    return end
+
+class BinaryProtocol:
+    """
+    Decodes request frames, runs them on a simulator FDCController and encodes the response
+    into a reused buffer: payloads are read with unpack_from straight out of the request and
+    written with pack_into, so a frame allocates no strings. Controller methods still print
+    their usual text; the stdin server sends that to stderr.
+    """
+
+    def __init__(self, controller, client=CLIENT):
+        self.controller = controller
+        self.client = client
+        self._out = bytearray(4096)
+        self._handlers = {
+            OP_READ_REGS: self._read_regs,
+            OP_WRITE_REGS: self._write_regs,
+            OP_TRIGGER: self._trigger,
+            OP_RESET: self._reset,
+            OP_ADVANCE: self._advance,
+            OP_STATUS: self._status,
+        }
+
+    def _room(self, size):
+        if len(self._out) < size:
+            self._out = bytearray(max(size, 2 * len(self._out)))
+        return self._out
+
+    def handle(self, frame):
+        """
+        Runs one request frame (header and payload) and returns the response as a memoryview
+        into the protocol's buffer, valid until the next call.
+        """
+        _, request_id, opcode, _ = HEADER.unpack_from(frame, 0)
+        handler = self._handlers.get(opcode)
+        status = STATUS_OK
+        end = BODY_OFFSET
+        if handler is None:
+            status = STATUS_UNKNOWN_OPCODE
+        else:
+            try:
+                with self.controller._lock:
+                    end = handler(frame)
+            except (struct.error, ValueError, KeyError, IndexError):
+                status, end = STATUS_BAD_REQUEST, BODY_OFFSET
+            except Exception:
+                status, end = STATUS_FAILED, BODY_OFFSET
+            self.controller.notify_state_listeners()
+        HEADER.pack_into(self._out, 0, end - LENGTH.size, request_id, opcode, status)
+        return memoryview(self._out)[:end]
+
+    def _read_regs(self, frame):
+        start, count = BLOCK.unpack_from(frame, BODY_OFFSET)
+        out = self._room(BODY_OFFSET + VALUE.size * count)
+        offset = BODY_OFFSET
+        read = self.controller.modbus_read
+        for reg in range(start, start + count):
+            VALUE.pack_into(out, offset, int(read(reg, self.client)))
+            offset += VALUE.size
+        return offset
+
+    def _write_regs(self, frame):
+        start, count = BLOCK.unpack_from(frame, BODY_OFFSET)
+        values = struct.unpack_from(f'<{count}i', frame, BODY_OFFSET + BLOCK.size)
+        for reg, value in enumerate(values, start):
+            self.controller.modbus_write(reg, value, self.client)
+        return BODY_OFFSET
+
+    def _trigger(self, frame):
+        alarm_type, zone = TRIGGER.unpack_from(frame, BODY_OFFSET)
+        self.controller.trigger_alarm(ALARM_TYPES[alarm_type], zone or None)
+        return BODY_OFFSET
+
+    def _reset(self, frame):
+        zone, = ZONE.unpack_from(frame, BODY_OFFSET)
+        self.controller.reset_alarms(zone or None)
+        return BODY_OFFSET
+
+    def _advance(self, frame):
+        seconds, = SECONDS.unpack_from(frame, BODY_OFFSET)
+        self.controller.simulate_time_pass(seconds)
+        return BODY_OFFSET
+
+    def _status(self, frame):
+        c = self.controller
+        zones = sorted(c.damper_positions)
+        out = self._room(BODY_OFFSET + STATUS_HEAD.size + STATUS_ZONE.size * len(zones))
+        STATUS_HEAD.pack_into(out, BODY_OFFSET, c.version, c.powered, c.external_alarm, c.relay_state == 'CLOSED',
+                              LED_CODES.get(c.led_status, 0), LED_CODES.get(c.led_fault, 0), c.analog_out,
+                              calendar.timegm(c.rtc.timetuple()), len(zones))
+        offset = BODY_OFFSET + STATUS_HEAD.size
+        for zone in zones:
+            bits = c.alarm_active.get(zone, False) | c.smoke_alarm.get(zone, False) << 1 | c.thermal_alarm.get(zone, False) << 2
+            STATUS_ZONE.pack_into(out, offset, zone, c.damper_positions[zone] == 'open', bits, c.temp_sensor.get(zone, 0.0))
+            offset += STATUS_ZONE.size
+        return offset
+
+def decode_status(frame):
+    """(head tuple, [(zone, damper open, alarm bits, temp)]) from a status response"""
+    head = STATUS_HEAD.unpack_from(frame, BODY_OFFSET)
+    zones = list(STATUS_ZONE.iter_unpack(frame[BODY_OFFSET + STATUS_HEAD.size:BODY_OFFSET + STATUS_HEAD.size + STATUS_ZONE.size * head[-1]]))
+    return head, zones
+
+def _read_exact(rfile, view):
+    got = 0
+    while got < len(view):
+        n = rfile.readinto(view[got:])
+        if not n:
+            return False
+        got += n
+    return True
+
+def serve_stream(controller, rfile, wfile):
+    """Answers frames from a binary stream (e.g. stdin.buffer) until it ends; one frame buffer is reused"""
+    protocol = BinaryProtocol(controller)
+    buf = bytearray(4096)
+    while True:
+        if not _read_exact(rfile, memoryview(buf)[:LENGTH.size]):
+            return
+        length, = LENGTH.unpack_from(buf, 0)
+        if not HEADER.size - LENGTH.size <= length <= MAX_FRAME:
+            return  # Out of sync; there is no way to find the next frame
+        if len(buf) < LENGTH.size + length:
+            grown = bytearray(LENGTH.size + length)
+            grown[:LENGTH.size] = buf[:LENGTH.size]
+            buf = grown
+        view = memoryview(buf)
+        if not _read_exact(rfile, view[LENGTH.size:LENGTH.size + length]):
+            return
+        wfile.write(protocol.handle(view))
+        wfile.flush()
+
+def bench(n=20000, zones=4):
+    """
+    Messages per second of the text path (command string in, printed reply parsed) against the
+    binary path (frame in, frame out, decoded) for the same mix: a 10-register block read, a register
+    write, trigger and reset, a one-second time advance and a status read.
+    """
+    from fdc_simulator import FDCController
+    results = {}
+    sink = io.StringIO()
+
+    text = FDCController(zones=zones)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        for i in range(n):
+            values = []
+            for reg in range(401, 411):
+                sink.seek(0)
+                sink.truncate()
+                text.process_command(f"modbus_read {reg}")
+                values.append(int(sink.getvalue().rsplit(':', 1)[1]))
+            text.process_command(f"modbus_write 311 {24 + i % 2}")
+            text.process_command("trigger_smoke 1")
+            text.process_command("reset_alarms 1")
+            text.process_command("simulate_time 1")
+            sink.seek(0)
+            sink.truncate()
+            text.process_command("status")
+            json.loads(sink.getvalue())
+    results['text'] = n * 15 / (time.perf_counter() - start)
+
+    binary = FDCController(zones=zones)
+    protocol = BinaryProtocol(binary)
+    frames = bytearray(4096)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        for i in range(n):
+            sink.seek(0)
+            sink.truncate()
+            protocol.handle(memoryview(frames)[:encode(frames, i, OP_READ_REGS, BLOCK, 401, 10)])
+            end = encode(frames, i, OP_WRITE_REGS, BLOCK, 311, 1)
+            protocol.handle(memoryview(frames)[:finish(frames, encode_values(frames, end, (24 + i % 2,)))])
+            protocol.handle(memoryview(frames)[:encode(frames, i, OP_TRIGGER, TRIGGER, 0, 1)])
+            protocol.handle(memoryview(frames)[:encode(frames, i, OP_RESET, ZONE, 1)])
+            protocol.handle(memoryview(frames)[:encode(frames, i, OP_ADVANCE, SECONDS, 1)])
+            decode_status(protocol.handle(memoryview(frames)[:encode(frames, i, OP_STATUS)]))
+    elapsed = time.perf_counter() - start
+    # The block read counts as the 10 messages the text path needs for it
+    results['binary'] = n * 15 / elapsed
+    results['binary_frames'] = n * 6 / elapsed
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark of the binary protocol against the text protocol "
+                                                 "(serve it with fdc_simulator.py --binary)")
+    parser.add_argument('--bench', type=int, metavar='N', default=20000, help="Rounds of the benchmark mix")
+    parser.add_argument('--zones', type=int, default=4)
+    args = parser.parse_args()
+    results = bench(args.bench, args.zones)
+    print(f"text:   {results['text']:,.0f} ops/s")
+    print(f"binary: {results['binary']:,.0f} ops/s ({results['binary_frames']:,.0f} frames/s), "
+          f"{results['binary'] / results['text']:.1f}x")
@@ -0,0 +1,212 @@
+# fdc_campaign.py
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import time
+from collections import Counter
+
+from fdc_simulator import FDCController
+
+# Registers the campaign may write, with the value range that keeps the RTC valid
+WRITABLE_REGISTERS = {
+    101: (0, 1), 102: (0, 1), 103: (0, 1), 104: (0, 1), 105: (0, 1),
+    302: (0, 1), 303: (0, 400), 304: (0, 400), 305: (0, 400),
+    308: (1, 28), 309: (0, 23), 310: (0, 59),
+    311: (1, 48), 312: (0, 23), 313: (0, 59), 314: (0, 1),
+}
+
+def random_command(rng, zones):
+    roll = rng.random()
+    zone = rng.randint(1, zones)
+    if roll < 0.05:
+        return rng.choice(["power_on", "power_off"])
+    if roll < 0.20:
+        return f"trigger_smoke {zone}"
+    if roll < 0.35:
+        return f"trigger_thermal {zone}"
+    if roll < 0.42:
+        return "trigger_external"
+    if roll < 0.55:
+        return rng.choice([f"reset_alarms {zone}", "reset_alarms"])
+    if roll < 0.62:
+        return "reset_smoke"
+    if roll < 0.70:
+        return f"set_temp {zone} {rng.choice([20, 45, 60, 73, 90])}"
+    if roll < 0.88:
+        reg = rng.choice(list(WRITABLE_REGISTERS))
+        low, high = WRITABLE_REGISTERS[reg]
+        return f"modbus_write {reg} {rng.randint(low, high)}"
+    return f"simulate_time {rng.choice([1, 60, 3600, 86400, 172800])}"
+
+def _expected_relay(c):
+    any_alarm = any(c.alarm_active.values())
+    if c.relay_mode == 'ALARM' or c.dip_sw4['DIP7'] == 0:
+        return 'CLOSED' if any_alarm else 'OPEN'
+    return 'OPEN' if any_alarm else 'CLOSED'
+
+def _expected_analog_out(c):
+    if not c.powered:
+        return 0
+    if not any(c.alarm_active.values()):
+        return 2
+    smoke = any(c.smoke_alarm.values())
+    thermal = any(c.thermal_alarm.values())
+    if sum([c.external_alarm, smoke, thermal]) > 1:
+        return 10
+    if smoke:
+        return 6
+    if thermal:
+        return 8
+    return 4
+
+def _expected_leds(c):
+    status = 'FLASH' if c.test_mode else ('ON' if c.powered else 'OFF')
+    return status, 'ON' if any(c.alarm_active.values()) else 'OFF'
+
+INVARIANTS = {
+    'relay_state': lambda c: c.relay_state == _expected_relay(c),
+    'analog_out': lambda c: c.analog_out == _expected_analog_out(c),
+    'leds': lambda c: (c.led_status, c.led_fault) == _expected_leds(c),
+}
+
+def relay_base(base, dip6, dip7):
+    """Clone of base with the relay DIP switches set: DIP6 1=ALARM, 0=FAN; DIP7 picks the FAN-mode polarity"""
+    controller = base.clone()
+    controller.dip_sw4['DIP6'], controller.dip_sw4['DIP7'] = dip6, dip7
+    controller.relay_mode = 'ALARM' if dip6 else 'FAN'
+    controller._update_relay()
+    return controller
+
+def run_sequence(base, commands):
+    """Replays commands on a clone of base; returns (step, violation) of the first failure or None"""
+    controller = base.clone()
+    for step, cmd in enumerate(commands):
+        try:
+            controller.process_command(cmd)
+        except Exception as e:
+            return step, f"exception:{type(e).__name__}"
+        for name, check in INVARIANTS.items():
+            if not check(controller):
+                return step, name
+    return None
+
+def shrink(base, commands, violation):
+    """Removes chunks of the failing sequence while it still fails with the same violation"""
+    commands = list(commands)
+    chunk = max(1, len(commands) // 2)
+    while chunk >= 1:
+        i = 0
+        while i < len(commands):
+            candidate = commands[:i] + commands[i + chunk:]
+            result = run_sequence(base, candidate) if candidate else None
+            if result and result[1] == violation:
+                commands = candidate[:result[0] + 1]
+            else:
+                i += chunk
+        chunk //= 2
+    return commands
+
+def run_shard(args):
+    seed, first_run, runs, length, zones, mode = args
+    controller = FDCController(model_type='FDC-4KJ' if zones == 4 else 'FDC-2KJ', mode=mode, zones=zones)
+    bases = {(dip6, dip7): relay_base(controller, dip6, dip7) for dip6 in (0, 1) for dip7 in (0, 1)}
+    outcomes = Counter()
+    commands_seen = Counter()
+    failures = {}
+    steps = 0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for run_id in range(first_run, first_run + runs):
+            rng = random.Random(f"{seed}:{run_id}")
+            commands = [random_command(rng, controller.zones) for _ in range(length)]
+            dips = (rng.randint(0, 1), rng.randint(0, 1))  # Drawn after the commands, so seeds keep their sequences
+            base = bases[dips]
+            result = run_sequence(base, commands)
+            if result is None:
+                outcomes['passed'] += 1
+                steps += length
+                commands_seen.update(cmd.split()[0] for cmd in commands)
+                continue
+            step, violation = result
+            steps += step + 1
+            commands_seen.update(cmd.split()[0] for cmd in commands[:step + 1])
+            outcomes[violation] += 1
+            minimal = shrink(base, commands[:step + 1], violation)
+            # Failures of one bug differ in zones and filler commands, so they are grouped by the
+            # violated invariant and the command that broke it; the shortest sequence is kept
+            entry = failures.setdefault((violation, minimal[-1].split()[0]), {'count': 0, 'first_run': run_id})
+            entry['count'] += 1
+            if 'commands' not in entry or len(minimal) < len(entry['commands']):
+                entry.update(commands=minimal, dips=dips)
+    return {'outcomes': outcomes, 'commands': commands_seen, 'failures': failures, 'steps': steps}
+
+def run_campaign(runs, length=50, seed=0, workers=None, zones=2, mode='fire', shard_size=500):
+    """Runs a seeded campaign across a process pool and aggregates the shard results"""
+    shards = [(seed, start, min(shard_size, runs - start), length, zones, mode)
+              for start in range(0, runs, shard_size)]
+    outcomes = Counter()
+    commands_seen = Counter()
+    failures = {}
+    steps = 0
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        for shard in pool.imap_unordered(run_shard, shards):
+            outcomes.update(shard['outcomes'])
+            commands_seen.update(shard['commands'])
+            steps += shard['steps']
+            for key, entry in shard['failures'].items():
+                merged = failures.setdefault(key, dict(entry, count=0))
+                merged['count'] += entry['count']
+                merged['first_run'] = min(merged['first_run'], entry['first_run'])
+                if len(entry['commands']) < len(merged['commands']):
+                    merged.update(commands=entry['commands'], dips=entry['dips'])
+    elapsed = time.perf_counter() - started
+    return {
+        'seed': seed,
+        'runs': runs,
+        'sequence_length': length,
+        'steps': steps,
+        'elapsed_s': round(elapsed, 3),
+        'sequences_per_s': round(runs / elapsed, 1) if elapsed else None,
+        'steps_per_s': round(steps / elapsed, 1) if elapsed else None,
+        'outcomes': dict(outcomes),
+        'failure_rate': round(1 - outcomes['passed'] / runs, 6) if runs else 0.0,
+        'command_counts': dict(commands_seen),
+        'distinct_failures': [
+            {'violation': violation, 'command': action, 'count': entry['count'], 'first_run': entry['first_run'],
+             'dip_sw4': {'DIP6': entry['dips'][0], 'DIP7': entry['dips'][1]}, 'commands': entry['commands']}
+            for (violation, action), entry in sorted(failures.items(), key=lambda item: -item[1]['count'])
+        ],
+    }
+
+def print_report(report, top=10):
+    print(f"Seed {report['seed']}: {report['runs']} sequences x {report['sequence_length']} commands, "
+          f"{report['steps']} steps in {report['elapsed_s']}s "
+          f"({report['sequences_per_s']} seq/s, {report['steps_per_s']} steps/s)")
+    print(f"Failure rate: {report['failure_rate']:.4%}")
+    for outcome, count in sorted(report['outcomes'].items(), key=lambda item: -item[1]):
+        print(f"  {outcome}: {count}")
+    for failure in report['distinct_failures'][:top]:
+        dips = failure['dip_sw4']
+        print(f"{failure['violation']} after {failure['command']} x{failure['count']} "
+              f"(first run {failure['first_run']}, DIP6={dips['DIP6']} DIP7={dips['DIP7']}):")
+        for cmd in failure['commands']:
+            print(f"    {cmd}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Randomized fault-injection campaign against FDCController")
+    parser.add_argument('--runs', type=int, default=10000)
+    parser.add_argument('--length', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--zones', type=int, default=2)
+    parser.add_argument('--mode', choices=['fire', 'smoke'], default='fire')
+    parser.add_argument('--json', action='store_true', help="Print the full report as JSON")
+    args = parser.parse_args()
+    report = run_campaign(args.runs, args.length, args.seed, args.workers, args.zones, args.mode)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
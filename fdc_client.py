@@ -0,0 +1,127 @@
+# fdc_client.py
+import asyncio
+import itertools
+import os
+import sys
+import threading
+from collections import deque
+
+from fdc_simulator import REQUEST_TAG
+
+SIMULATOR_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fdc_simulator.py')
+
+class SimulatorClient:
+    """
+    asyncio client that runs fdc_simulator.py as a child process.
+    Commands are tagged with request IDs and pipelined over the pipes: send() returns at once
+    with a future that resolves to the output lines of that command.
+    Lines the simulator prints outside of any request (startup banner, log entries) go to on_event.
+    """
+
+    def __init__(self, script=SIMULATOR_SCRIPT, python=sys.executable, cwd=None, on_event=None):
+        self.script = script
+        self.python = python
+        self.cwd = cwd
+        self.on_event = on_event
+        self.process = None
+        self._ids = itertools.count(1)
+        self._pending = deque()  # (tag, future, lines) in send order; the simulator answers in order
+        self._reader = None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            self.python, '-u', self.script, cwd=self.cwd,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
+        self._reader = asyncio.create_task(self._read_loop())
+
+    def send(self, cmd):
+        """Queues a command without waiting; returns a future with the list of output lines"""
+        if self.process is None or self.process.returncode is not None:
+            raise RuntimeError("Simulator is not running")
+        tag = str(next(self._ids))
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((tag, future, []))
+        self.process.stdin.write(f"{REQUEST_TAG}{tag} {cmd.strip()}\n".encode())
+        return future
+
+    async def command(self, cmd):
+        future = self.send(cmd)
+        await self.process.stdin.drain()
+        return await future
+
+    async def _read_loop(self):
+        done_suffix = ' done'
+        while True:
+            raw = await self.process.stdout.readline()
+            if not raw:
+                break
+            line = raw.decode(errors='replace').rstrip('\r\n')
+            if line.startswith(REQUEST_TAG) and line.endswith(done_suffix):
+                tag = line[len(REQUEST_TAG):-len(done_suffix)]
+                if self._pending and self._pending[0][0] == tag:
+                    _, future, lines = self._pending.popleft()
+                    if not future.done():
+                        future.set_result(lines)
+                continue
+            if self._pending:
+                self._pending[0][2].append(line)
+            if self.on_event and (not self._pending or line.startswith('[')):
+                self.on_event(line)
+        while self._pending:
+            _, future, lines = self._pending.popleft()
+            if not future.done():
+                future.set_exception(ConnectionError("Simulator exited before answering"))
+
+    async def close(self):
+        if self.process is None:
+            return
+        if self.process.returncode is None:
+            try:
+                self.process.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            await self.process.wait()
+        if self._reader:
+            await self._reader
+
+class KivySimulatorBridge:
+    """
+    Runs a SimulatorClient on its own asyncio loop in a background thread and hands
+    responses and events to the Kivy loop with Clock.schedule_once, so frames never wait on the pipe.
+    """
+
+    def __init__(self, on_event=None, **client_kwargs):
+        self.on_event = on_event
+        self.loop = asyncio.new_event_loop()
+        self.client = SimulatorClient(on_event=self._event, **client_kwargs)
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.client.start(), self.loop).result()
+
+    def submit(self, cmd, callback=None):
+        """Sends cmd from any thread; callback(lines) runs on the Kivy thread"""
+        def _send():
+            future = self.client.send(cmd)
+            if callback:
+                future.add_done_callback(lambda f: self._deliver(callback, f))
+        self.loop.call_soon_threadsafe(_send)
+
+    def _deliver(self, callback, future):
+        from kivy.clock import Clock
+        if future.cancelled():
+            lines = ["Request cancelled"]  # The client closed before the response arrived
+        else:
+            lines = future.result() if not future.exception() else [str(future.exception())]
+        Clock.schedule_once(lambda dt: callback(lines))
+
+    def _event(self, line):
+        if self.on_event:
+            from kivy.clock import Clock
+            Clock.schedule_once(lambda dt: self.on_event(line))
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.client.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
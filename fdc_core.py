@@ -0,0 +1,433 @@
+# fdc_core.py
+# Controller logic used by the GUI, kept free of Kivy so tools and the headless runner import it quickly.
+import datetime
+import functools
+import json
+import os
+import threading
+from fdc_eventlog import with_repeats
+from fdc_recorder import Series
+from fdc_statefile import extend_json_list, read_state, write_sections
+
+METRICS_FILE = 'fdc_metrics.jsonl'
+COALESCE_WINDOW = 0  # Seconds within which a repeat of an active alarm is counted on its log entry; 0 is off
+TREND_SIGNALS = {'temp': 'f', 'alarm': 'b', 'damper': 'b'}  # Per-zone trend series and their array typecodes
+
+def record_startup_metric(name, seconds, path=METRICS_FILE):
+    """Appends a startup-time measurement and prints it"""
+    print(f"{name} startup: {seconds * 1000:.1f} ms")
+    with open(path, 'a') as f:
+        f.write(json.dumps({'metric': f'{name}_startup_ms', 'value': round(seconds * 1000, 1),
+                            'time': datetime.datetime.now().isoformat()}) + '\n')
+
+def _encode_report(report):
+    return {'timestamp': report['timestamp'].isoformat(), 'zones': report['zones'], 'status': report['status']}
+
+def _decode_report(report):
+    return {'timestamp': datetime.datetime.fromisoformat(report['timestamp']), 'zones': report['zones'], 'status': report['status']}
+
+def _synchronized(method):
+    """Runs the method while holding the controller's state lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class FDCController:
+    """
+    GUI-side controller model. Zones are added, removed and changed only through its methods, which
+    hold one re-entrant state lock; readers get copies, so the UI thread, timers and the export or
+    headless threads never iterate a dict another thread is resizing.
+    """
+
+    def __init__(self, model_type, mode, zones):
+        self._lock = threading.RLock()
+        self.model_type = model_type
+        self.mode = mode
+        self.zones = zones
+        self.damper_positions = {i: 'closed' for i in range(1, zones+1)}
+        self.alarm_active = {i: False for i in range(1, zones+1)}
+        self.smoke_alarms = {i: False for i in range(1, zones+1)}
+        self.thermal_alarms = {i: False for i in range(1, zones+1)}
+        self.external_alarms = {i: False for i in range(1, zones+1)}
+        self.temp_sensor = {i: 20 for i in range(1, zones+1)}
+        self.zone_names = {i: f"Zone {i}" for i in range(1, zones+1)}
+        self.led_status = 'OFF'
+        self.relay_state = 'OPEN'
+        self.logs = {i: [] for i in range(1, zones+1)}
+        self.test_mode = False
+        self.auto_test_enabled = False
+        self.auto_test_interval_hours = 24
+        self.auto_test_hour = 0
+        self.auto_test_minute = 0
+        self.next_auto_test = None
+        self.test_reports = []
+        # Log and report sections of a loaded state file, still encoded; self.logs[zone] and
+        # self.test_reports hold only what was added after loading until a reader decodes them
+        self._pending_logs = {}
+        self._pending_reports = None
+        self.coalesce_window = COALESCE_WINDOW  # 0 disables coalescing
+        self._alarm_events = {}  # (zone, type) -> [time of the last trigger, time of its log entry, message, repeats]
+        self.archive = None  # fdc_archive.Archive also receiving every test report and alarm event
+        # Per-zone {signal: Series} on the wall clock, sampled whenever a value changes
+        self.trends = {}
+        self.trend_version = 0  # Bumped on every new trend sample
+        for i in range(1, zones+1):
+            self._record_trend(i)
+
+    def _record_trend(self, zone, ts=None):
+        t = (ts or datetime.datetime.now()).timestamp()
+        series = self.trends.get(zone)
+        if series is None:
+            series = self.trends[zone] = {name: Series(typecode) for name, typecode in TREND_SIGNALS.items()}
+        values = {'temp': self.temp_sensor.get(zone, 20), 'alarm': int(bool(self.alarm_active.get(zone))),
+                  'damper': int(self.damper_positions.get(zone) == 'open')}
+        for name, value in values.items():
+            if series[name].last is None or series[name].last[1] != value:
+                series[name].append(t, value)
+                self.trend_version += 1
+
+    @_synchronized
+    def get_trend(self, zone, signal, start=None, end=None, buckets=None):
+        """
+        (times, values) of a zone's temp/alarm/damper trend in epoch seconds, starting with the value
+        in effect at start. With buckets, a long series comes back as per-bucket min and max points.
+        """
+        series = self.trends.get(zone, {}).get(signal)
+        if series is None:
+            return [], []
+        if buckets and start is not None and end is not None and len(series) > 4 * buckets:
+            times, values = [], []
+            width = (end - start) / buckets
+            for t, vmin, vmax in series.downsample(start, end, buckets):
+                times.extend((t, t + width / 2))
+                values.extend((vmin, vmax))
+        else:
+            times, values = series.query(start, end)
+        if start is not None and (not times or times[0] > start):
+            prior = series.value_at(start)
+            if prior is not None:
+                times.insert(0, start)
+                values.insert(0, prior)
+        return times, values
+
+    @_synchronized
+    def get_status(self):
+        return {
+            'damper_positions': dict(self.damper_positions),
+            'smoke_alarms': dict(self.smoke_alarms),
+            'thermal_alarms': dict(self.thermal_alarms),
+            'external_alarms': dict(self.external_alarms),
+            'temp_sensor': dict(self.temp_sensor),
+            'led_status': self.led_status,
+            'relay_state': self.relay_state,
+        }
+
+    def _load_logs(self, zone):
+        """Decodes a zone's saved log section on first use, ahead of anything logged since loading"""
+        raw = self._pending_logs.pop(zone, None)
+        if raw is not None:
+            saved = [(datetime.datetime.fromisoformat(ts), msg) for ts, msg in json.loads(raw)]
+            self.logs[zone] = saved + self.logs.get(zone, [])
+
+    def _load_reports(self):
+        raw, self._pending_reports = self._pending_reports, None
+        if raw is not None:
+            self.test_reports = [_decode_report(r) for r in json.loads(raw)] + self.test_reports
+
+    @_synchronized
+    def get_logs(self, zone):
+        self._load_logs(zone)
+        return list(self.logs.get(zone, []))
+
+    @_synchronized
+    def get_test_reports(self):
+        self._load_reports()
+        return list(self.test_reports)
+
+    @_synchronized
+    def snapshot_logs(self):
+        """({zone: [(ts, msg)]}, test reports) copied in one step, for readers on other threads"""
+        for zone in list(self._pending_logs):
+            self._load_logs(zone)
+        self._load_reports()
+        return {zone: list(entries) for zone, entries in self.logs.items()}, list(self.test_reports)
+
+    @_synchronized
+    def attach_archive(self, archive):
+        """Archives reports and alarms from now on; an empty archive first gets the reports in memory"""
+        self.archive = archive
+        if not archive.count_reports():
+            for report in self.get_test_reports():
+                archive.add_report(report)
+
+    @_synchronized
+    def add_zone(self, zone, name=None):
+        self.zone_names[zone] = name or f"Zone {zone}"
+        self.damper_positions[zone] = 'closed'
+        self.alarm_active[zone] = False
+        self.smoke_alarms[zone] = False
+        self.thermal_alarms[zone] = False
+        self.external_alarms[zone] = False
+        self.temp_sensor[zone] = 20
+        self.logs[zone] = []
+        self._record_trend(zone)
+
+    @_synchronized
+    def remove_zone(self, zone):
+        for zone_dict in (self.zone_names, self.damper_positions, self.alarm_active, self.smoke_alarms,
+                          self.thermal_alarms, self.external_alarms, self.temp_sensor, self.logs, self.trends,
+                          self._pending_logs):
+            zone_dict.pop(zone, None)
+        for key in [key for key in self._alarm_events if key[0] == zone]:
+            del self._alarm_events[key]
+
+    @_synchronized
+    def reset_zone_alarms(self, zone):
+        self.alarm_active[zone] = False
+        self.smoke_alarms[zone] = False
+        self.thermal_alarms[zone] = False
+        self.external_alarms[zone] = False
+        self._set_working_position()
+        self._update_leds()
+        self._update_relay()
+        self._update_analog_out()
+        self.logs[zone].append((datetime.datetime.now(), "Alarm deactivated"))
+        self._record_trend(zone)
+
+    @_synchronized
+    def adjust_temperature(self, zone, delta):
+        """Changes a zone's temperature by delta and raises a thermal alarm above 72"""
+        self.temp_sensor[zone] += delta
+        self._record_trend(zone)
+        if self.temp_sensor[zone] > 72:
+            self.trigger_alarm('thermal', zone)
+
+    def _coalesce(self, type, zone, now):
+        """
+        Folds a repeat of a still-active alarm, triggered within coalesce_window seconds of the
+        last one, into a counter on its log entry. Returns False when the trigger must run in full.
+        """
+        last = self._alarm_events.get((zone, type))
+        if not last or not self.coalesce_window or (now - last[0]).total_seconds() > self.coalesce_window:
+            return False
+        flags = {'smoke': self.smoke_alarms, 'thermal': self.thermal_alarms, 'external': self.external_alarms}
+        if not (self.alarm_active.get(zone) and flags[type].get(zone)):
+            return False
+        # The entry is near the end unless the zone logged a lot since; the window keeps that short
+        entries = self.logs.get(zone, [])
+        for i in range(len(entries) - 1, -1, -1):
+            if entries[i][0] == last[1]:
+                last[0] = now
+                last[3] += 1
+                entries[i] = (last[1], with_repeats(last[2], last[3]))
+                return True
+        return False
+
+    @_synchronized
+    def trigger_alarm(self, type, zone):
+        ts = datetime.datetime.now()
+        if self._coalesce(type, zone, ts):
+            return
+        if type == 'smoke':
+            self.smoke_alarms[zone] = True
+            msg = "Smoke alarm triggered"
+        elif type == 'thermal':
+            self.thermal_alarms[zone] = True
+            msg = "Thermal alarm triggered"
+        elif type == 'external':
+            self.external_alarms[zone] = True
+            msg = "External alarm triggered"
+        self.alarm_active[zone] = True
+        self.logs[zone].append((ts, msg))
+        self._alarm_events[(zone, type)] = [ts, ts, msg, 0]
+        if self.archive:
+            self.archive.add_alarm(ts, zone, type, msg)
+        self._record_trend(zone, ts)
+        self._update_leds()
+        self._update_relay()
+
+    def _set_working_position(self):
+        pass
+
+    def _update_leds(self):
+        any_alarm = any(self.alarm_active.values())
+        if self.test_mode or any_alarm:
+            self.led_status = 'FLASH'
+        else:
+            self.led_status = 'OFF'
+
+    def _update_relay(self):
+        any_alarm = any(self.alarm_active.values())
+        if any_alarm:
+            self.relay_state = 'CLOSED'
+        else:
+            self.relay_state = 'OPEN'
+
+    def _update_analog_out(self):
+        pass
+
+    @_synchronized
+    def perform_full_test(self):
+        ts = datetime.datetime.now()
+        report = {'timestamp': ts, 'zones': {}, 'status': 'PASSED'}
+        self._load_reports()  # The report history is capped, so the saved reports must be in place first
+        if any(self.alarm_active.values()):
+            for i in range(1, self.zones + 1):
+                self.logs[i].append((ts, "Test failed: Active alarms detected"))
+                report['zones'][i] = ["Failed: Active alarms detected"]
+                report['status'] = 'FAILED'
+            self.test_reports.append(report)
+            if self.archive:
+                self.archive.add_report(report)
+            for i in range(1, self.zones + 1):
+                self.logs[i].append((ts, f"Test Report - Status: {report['status']}, Zone {i}: {report['zones'][i][0]}"))
+            return
+        self.test_mode = True
+        self._update_leds()
+        for i in range(1, self.zones + 1):
+            self.damper_positions[i] = 'closed'
+            self.logs[i].append((ts, "Full test started: Damper closed"))
+            self._record_trend(i, ts)
+            report['zones'][i] = ["Damper closed"]
+        for i in range(1, self.zones + 1):
+            self.damper_positions[i] = 'open'
+            self.logs[i].append((ts, "Full test: Damper opened"))
+            self._record_trend(i, ts)
+            report['zones'][i].append("Damper opened")
+        for i in range(1, self.zones + 1):
+            self.damper_positions[i] = 'closed'
+            self.logs[i].append((ts, "Full test: Damper closed again"))
+            self._record_trend(i, ts)
+            report['zones'][i].append("Damper closed again")
+        for i in range(1, self.zones + 1):
+            self.logs[i].append((ts, "Full test passed"))
+            report['zones'][i].append("Test passed")
+        self.test_mode = False
+        self._set_working_position()
+        self._update_leds()
+        self.test_reports.append(report)
+        if self.archive:
+            self.archive.add_report(report)
+        for i in range(1, self.zones + 1):
+            self.logs[i].append((ts, f"Test Report - Status: {report['status']}, Zone {i}: {', '.join(report['zones'][i])}"))
+        if len(self.test_reports) > 50:
+            self.test_reports.pop(0)
+
+    @_synchronized
+    def _schedule_next_auto_test(self):
+        now = datetime.datetime.now()
+        next_time = now.replace(hour=self.auto_test_hour, minute=self.auto_test_minute, second=0, microsecond=0)
+        interval = datetime.timedelta(hours=self.auto_test_interval_hours)
+        while next_time <= now:
+            next_time += interval
+        self.next_auto_test = next_time
+        ts = datetime.datetime.now()
+        for i in range(1, self.zones + 1):
+            self.logs[i].append((ts, f"Next auto test scheduled at {next_time.strftime('%Y-%m-%d %H:%M:%S')}"))
+
+    @_synchronized
+    def check_auto_test(self, now=None):
+        """Runs the full test if the next auto test is due; returns True when it ran"""
+        now = now or datetime.datetime.now()
+        if self.auto_test_enabled and self.next_auto_test and now >= self.next_auto_test:
+            self.perform_full_test()
+            self._schedule_next_auto_test()
+            return True
+        return False
+
+    @_synchronized
+    def set_auto_test_params(self, enabled, interval, hour, minute):
+        self.auto_test_enabled = enabled
+        self.auto_test_interval_hours = max(1, interval)
+        self.auto_test_hour = hour % 24
+        self.auto_test_minute = minute % 60
+        ts = datetime.datetime.now()
+        status = "enabled" if enabled else "disabled"
+        for i in range(1, self.zones + 1):
+            self.logs[i].append((ts, f"Auto test {status}: Interval {interval}h, Time {hour:02d}:{minute:02d}"))
+        if enabled:
+            self._schedule_next_auto_test()
+
+    def save_state(self, file_path):
+        """
+        Writes a sectioned state file: config, then one section per zone log and the test reports.
+        Sections that were never decoded since loading are written back as the saved bytes.
+        """
+        with self._lock:
+            logs = {k: list(v) for k, v in self.logs.items()}
+            reports = list(self.test_reports)
+            pending_logs = dict(self._pending_logs)
+            pending_reports = self._pending_reports
+            state = {
+                'model_type': self.model_type,
+                'mode': self.mode,
+                'zone_names': {str(k): v for k, v in self.zone_names.items()},
+                'damper_positions': {str(k): v for k, v in self.damper_positions.items()},
+                'alarm_active': {str(k): v for k, v in self.alarm_active.items()},
+                'smoke_alarms': {str(k): v for k, v in self.smoke_alarms.items()},
+                'thermal_alarms': {str(k): v for k, v in self.thermal_alarms.items()},
+                'external_alarms': {str(k): v for k, v in self.external_alarms.items()},
+                'temp_sensor': {str(k): v for k, v in self.temp_sensor.items()},
+                'test_mode': self.test_mode,
+                'auto_test_enabled': self.auto_test_enabled,
+                'auto_test_interval_hours': self.auto_test_interval_hours,
+                'auto_test_hour': self.auto_test_hour,
+                'auto_test_minute': self.auto_test_minute,
+                'coalesce_window': self.coalesce_window,
+                'next_auto_test': self.next_auto_test.isoformat() if self.next_auto_test else None
+            }
+        # Serialize the copied logs and reports after releasing the lock
+        sections = {'config': state}
+        for zone, entries in logs.items():
+            encoded = [(ts.isoformat(), msg) for ts, msg in entries]
+            raw = pending_logs.get(zone)
+            sections[f'logs/{zone}'] = encoded if raw is None else extend_json_list(raw, encoded)
+        encoded = [_encode_report(r) for r in reports]
+        sections['test_reports'] = encoded if pending_reports is None else extend_json_list(pending_reports, encoded)
+        write_sections(file_path, sections)
+
+    @_synchronized
+    def load_state(self, file_path):
+        """
+        Loads config and status at once; zone logs and test reports are decoded when first read.
+        Older single-JSON state files are loaded eagerly as before.
+        """
+        if os.path.exists(file_path):
+            reader, state = read_state(file_path)
+            if reader:
+                state = reader.load('config')
+            self.model_type = state.get('model_type', self.model_type)
+            self.mode = state.get('mode', self.mode)
+            self.zone_names = {int(k): v for k, v in state.get('zone_names', {}).items()}
+            self.damper_positions = {int(k): v for k, v in state.get('damper_positions', {}).items()}
+            self.alarm_active = {int(k): v for k, v in state.get('alarm_active', {}).items()}
+            self.smoke_alarms = {int(k): v for k, v in state.get('smoke_alarms', {}).items()}
+            self.thermal_alarms = {int(k): v for k, v in state.get('thermal_alarms', {}).items()}
+            self.external_alarms = {int(k): v for k, v in state.get('external_alarms', {}).items()}
+            self.temp_sensor = {int(k): v for k, v in state.get('temp_sensor', {}).items()}
+            if reader:
+                self._pending_logs = {int(name[5:]): reader.raw(name) for name in reader.names() if name.startswith('logs/')}
+                self.logs = {zone: [] for zone in self._pending_logs}
+            else:
+                self._pending_logs = {}
+                self.logs = {int(k): [(datetime.datetime.fromisoformat(ts), msg) for ts, msg in v] for k, v in state.get('logs', {}).items()}
+            self.zones = max(self.zone_names.keys() or [0])
+            self.test_mode = state.get('test_mode', False)
+            self.auto_test_enabled = state.get('auto_test_enabled', False)
+            self.auto_test_interval_hours = state.get('auto_test_interval_hours', 24)
+            self.auto_test_hour = state.get('auto_test_hour', 0)
+            self.auto_test_minute = state.get('auto_test_minute', 0)
+            self.coalesce_window = state.get('coalesce_window', COALESCE_WINDOW)
+            self._alarm_events = {}
+            self.next_auto_test = datetime.datetime.fromisoformat(state['next_auto_test']) if state.get('next_auto_test') else None
+            if reader:
+                self._pending_reports = reader.raw('test_reports') if 'test_reports' in reader else None
+                self.test_reports = []
+            else:
+                self._pending_reports = None
+                self.test_reports = [_decode_report(r) for r in state.get('test_reports', [])]
+            self.trends = {}
+            for zone in self.zone_names:
+                self._record_trend(zone)
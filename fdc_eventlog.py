@@ -0,0 +1,262 @@
+# fdc_eventlog.py
+import bisect
+import datetime
+import heapq
+from collections import defaultdict
+
+CONTROLLER_ZONE = 0  # Zone of controller-wide events, stored once and shown in every zone's view
+
+def with_repeats(message, repeats):
+    """Message of an entry as shown, noting how many coalesced repeats it stands for"""
+    return f"{message} (repeated {repeats} times)" if repeats else message
+
+class _TimeIndex:
+    """Parallel (time, seq) lists kept sorted by time; appends in time order are O(1)"""
+    __slots__ = ('times', 'seqs')
+
+    def __init__(self):
+        self.times = []
+        self.seqs = []
+
+    def add(self, time, seq):
+        if not self.times or time >= self.times[-1]:
+            self.times.append(time)
+            self.seqs.append(seq)
+        else:  # RTC was set back
+            i = bisect.bisect_right(self.times, time)
+            self.times.insert(i, time)
+            self.seqs.insert(i, seq)
+
+    def iter_range(self, since=None, until=None):
+        lo = 0 if since is None else bisect.bisect_left(self.times, since)
+        hi = len(self.times) if until is None else bisect.bisect_right(self.times, until)
+        times, seqs = self.times, self.seqs
+        for i in range(lo, hi):
+            yield times[i], seqs[i]
+
+class EventLog:
+    """
+    Structured log of controller events: (time, zone, event_type, message) keyed by a sequence number.
+    Time, event-type and zone indexes answer range queries with a bisect instead of a scan.
+    fork() returns a child that shares everything logged so far and only stores its own appends.
+    An entry can carry a repeat counter, so a burst of identical events is stored once.
+    The oldest entries are dropped in batches once max_entries is exceeded.
+    """
+
+    def __init__(self, max_entries=100000, parent=None):
+        self.max_entries = max_entries
+        self._parent = parent
+        self._cutoff = parent._next_seq if parent else 0  # Parent entries visible to this log
+        self._first_seq = self._cutoff
+        self._next_seq = self._cutoff
+        self._entries = []
+        self._time_index = _TimeIndex()
+        self._type_index = defaultdict(_TimeIndex)
+        self._zone_index = defaultdict(_TimeIndex)
+        self._zone_seqs = defaultdict(list)  # Logging order per zone, for tail()
+        self._repeats = {}  # seq -> times the entry recurred after it was logged
+
+    def __len__(self):
+        own = len(self._entries)
+        return own + (min(len(self._parent), self._cutoff) if self._parent is not None else 0)
+
+    @property
+    def next_seq(self):
+        """Sequence number the next appended entry will get"""
+        return self._next_seq
+
+    def append(self, time, zone, event_type, message):
+        seq = self._next_seq
+        self._next_seq += 1
+        self._entries.append((time, zone, event_type, message))
+        self._index(seq, time, zone, event_type)
+        if self.max_entries and len(self._entries) > self.max_entries + self.max_entries // 10:
+            self._trim()
+        return seq
+
+    def _index(self, seq, time, zone, event_type):
+        self._time_index.add(time, seq)
+        self._type_index[event_type].add(time, seq)
+        self._zone_index[zone].add(time, seq)
+        self._zone_seqs[zone].append(seq)
+
+    def add_repeat(self, seq, count=1):
+        """Counts another occurrence of the entry seq instead of appending a new one"""
+        self._repeats[seq] = self.repeats(seq) + count
+
+    def repeats(self, seq):
+        if seq in self._repeats:
+            return self._repeats[seq]
+        # fork() copies the parent's counters, so a later bump there must not be looked up; only a
+        # saved log, which fork leaves unloaded and which never changes, is asked
+        if isinstance(self._parent, LazyEventLog) and seq < self._cutoff:
+            return self._parent.repeats(seq)
+        return 0
+
+    def _trim(self):
+        drop = len(self._entries) - self.max_entries
+        self._entries = self._entries[drop:]
+        self._first_seq += drop
+        self._repeats = {seq: n for seq, n in self._repeats.items() if seq < self._cutoff or seq >= self._first_seq}
+        self._time_index = _TimeIndex()
+        self._type_index = defaultdict(_TimeIndex)
+        self._zone_index = defaultdict(_TimeIndex)
+        self._zone_seqs = defaultdict(list)
+        for offset, (time, zone, event_type, _) in enumerate(self._entries):
+            self._index(self._first_seq + offset, time, zone, event_type)
+
+    def get(self, seq):
+        if seq >= self._first_seq:
+            offset = seq - self._first_seq
+            return self._entries[offset] if offset < len(self._entries) else None
+        if self._parent is not None and seq < self._cutoff:
+            return self._parent.get(seq)
+        return None
+
+    def has_zone(self, zone):
+        if self._zone_seqs.get(zone):
+            return True
+        return bool(self._parent and self._parent._tail_seqs([zone], 1, self._cutoff))
+
+    def _tail_seqs(self, zones, n, max_seq=None):
+        """Sequence numbers of the last n entries of zones (below max_seq), ascending"""
+        seqs = []
+        for zone in zones:
+            zone_seqs = self._zone_seqs.get(zone)
+            if zone_seqs:
+                end = len(zone_seqs) if max_seq is None else bisect.bisect_left(zone_seqs, max_seq)
+                seqs.extend(zone_seqs[max(0, end - n):end])
+        seqs.sort()
+        seqs = seqs[-n:]
+        if self._parent is not None and len(seqs) < n:
+            limit = self._cutoff if max_seq is None else min(max_seq, self._cutoff)
+            seqs = self._parent._tail_seqs(zones, n - len(seqs), limit) + seqs
+        return seqs
+
+    def tail(self, zones, n):
+        """Last n entries of the given zones in logging order, as (seq, entry)"""
+        return [(seq, self.get(seq)) for seq in self._tail_seqs(zones, n)]
+
+    def fork(self):
+        child = EventLog(self.max_entries, parent=self)
+        # Counters the parent bumps later must not show up in the child
+        child._repeats = dict(self._repeats)
+        return child
+
+    @property
+    def depth(self):
+        """Forks between this log and its root; a LazyEventLog root is not loaded to count it"""
+        depth, log = 0, self._parent
+        while isinstance(log, EventLog):
+            depth += 1
+            log = log._parent
+        return depth
+
+    def flatten(self):
+        """
+        Root log holding the entries and repeat counts visible here, with their seqs, so lookups
+        stop walking a chain of forks. Entries before a gap left by trimming are dropped.
+        """
+        flat = EventLog(self.max_entries)
+        for seq, (time, zone, event_type, message) in self.entries():
+            if seq != flat._next_seq:
+                flat = EventLog(self.max_entries)
+                flat._first_seq = flat._next_seq = seq
+            flat.append(time, zone, event_type, message)
+            repeats = self.repeats(seq)
+            if repeats:
+                flat._repeats[seq] = repeats
+        return flat
+
+    def _candidates(self, zones, since, until, types, max_seq):
+        """Yields (time, seq, entry) in time order from the narrowest index for the query"""
+        if types:
+            indexes = [self._type_index[t] for t in types if t in self._type_index]
+        elif zones:
+            indexes = [self._zone_index[z] for z in zones if z in self._zone_index]
+        else:
+            indexes = [self._time_index]
+        own = heapq.merge(*(index.iter_range(since, until) for index in indexes))
+        own = ((time, seq, self._entries[seq - self._first_seq]) for time, seq in own
+               if max_seq is None or seq < max_seq)
+        if self._parent is None:
+            return own
+        limit = self._cutoff if max_seq is None else min(max_seq, self._cutoff)
+        return heapq.merge(self._parent._candidates(zones, since, until, types, limit), own)
+
+    def query(self, zones=None, since=None, until=None, types=None, limit=None):
+        """Entries matching all given filters, oldest first, as (seq, (time, zone, event_type, message))"""
+        zones = set(zones) if zones else None
+        types = set(types) if types else None
+        results = []
+        for _, seq, entry in self._candidates(zones, since, until, types, None):
+            if zones and types and entry[1] not in zones:
+                continue
+            results.append((seq, entry))
+            if limit and len(results) >= limit:
+                break
+        return results
+
+    def entries(self):
+        """All (seq, entry) pairs in the order they were logged"""
+        if self._parent is not None:
+            for seq, entry in self._parent.entries():
+                if seq >= self._cutoff:
+                    break
+                yield seq, entry
+        # Bind the list and its first seq once: a concurrent _trim() swaps both out
+        entries, first_seq = self._entries, self._first_seq
+        for offset, entry in enumerate(entries):
+            yield first_seq + offset, entry
+
+    def to_list(self):
+        """[time, zone, event_type, message] per entry, with the repeat count appended when it has one"""
+        items = []
+        for seq, (time, zone, event_type, message) in self.entries():
+            item = [time.isoformat(), zone, event_type, message]
+            repeats = self.repeats(seq)
+            if repeats:
+                item.append(repeats)
+            items.append(item)
+        return items
+
+    @classmethod
+    def from_list(cls, items, max_entries=100000):
+        log = cls(max_entries)
+        for time, zone, event_type, message, *repeats in items:
+            seq = log.append(datetime.datetime.fromisoformat(time), zone, event_type, message)
+            if repeats:
+                log._repeats[seq] = repeats[0]
+        return log
+
+class LazyEventLog:
+    """
+    Stands in for a saved EventLog until it is first read: fork it with EventLog(parent=lazy)
+    and the child takes new entries right away, while the saved ones are decoded by loader()
+    only when a query, tail or export reaches them.
+    """
+
+    def __init__(self, loader, count):
+        self._loader = loader
+        self._log = None
+        self._next_seq = count  # What a fork's cutoff needs, known without loading
+
+    def _load(self):
+        if self._log is None:
+            self._log = self._loader()
+            self._loader = None
+        return self._log
+
+    @property
+    def loaded(self):
+        return self._log is not None
+
+    def __bool__(self):
+        return True
+
+    def __len__(self):
+        # from_list numbers the saved entries from 0, so the count is their length
+        return len(self._log) if self._log is not None else self._next_seq
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
@@ -0,0 +1,88 @@
+# fdc_export.py
+import csv
+import datetime
+import gzip
+import json
+import threading
+
+FIELDS = ['source', 'time', 'zone', 'type', 'status', 'message', 'repeats']
+
+def _time_str(ts):
+    return ts.strftime('%Y-%m-%d %H:%M:%S') if isinstance(ts, datetime.datetime) else str(ts)
+
+def simulator_records(controller):
+    """
+    Every entry of a simulator FDCController's event log, oldest first, with the count of
+    coalesced repeats each entry stands for. The log is forked under the controller's lock right
+    away; the records are read from the fork, without the lock.
+    """
+    with controller._lock:
+        events = controller.events.fork()
+    return _event_records(events)
+
+def _event_records(events):
+    for seq, (ts, zone, event_type, message) in events.entries():
+        yield {'source': 'log', 'time': _time_str(ts), 'zone': zone, 'type': event_type, 'status': '', 'message': message,
+               'repeats': events.repeats(seq)}
+
+def gui_records(controller):
+    """
+    Yields the GUI controller's per-zone logs, then one record per zone of each test report.
+    The GUI notes coalesced repeats in the log message itself, so repeats stays empty.
+    """
+    logs, reports = controller.snapshot_logs()  # Copies, so the UI thread can keep logging meanwhile
+    for zone, entries in logs.items():
+        for ts, msg in entries:
+            yield {'source': 'log', 'time': _time_str(ts), 'zone': zone, 'type': '', 'status': '', 'message': msg,
+                   'repeats': ''}
+    for report in reports:
+        for zone, actions in list(report['zones'].items()):
+            yield {'source': 'test_report', 'time': _time_str(report['timestamp']), 'zone': zone, 'type': 'test',
+                   'status': report['status'], 'message': ', '.join(actions), 'repeats': ''}
+
+def _open(path, compress):
+    if compress:
+        return gzip.open(path, 'wt', newline='', encoding='utf-8')
+    return open(path, 'w', newline='', encoding='utf-8')
+
+def export_records(records, path, fmt=None, compress=None):
+    """
+    Streams records to path as CSV or JSON Lines, one record at a time.
+    fmt and compress default from the file name (.csv / .jsonl, optional .gz). Returns the record count.
+    """
+    name = path[:-3] if path.endswith('.gz') else path
+    if compress is None:
+        compress = path.endswith('.gz')
+    if fmt is None:
+        fmt = 'jsonl' if name.endswith(('.jsonl', '.json')) else 'csv'
+    count = 0
+    with _open(path, compress) as f:
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            for record in records:
+                writer.writerow(record)
+                count += 1
+        elif fmt == 'jsonl':
+            for record in records:
+                f.write(json.dumps(record))
+                f.write('\n')
+                count += 1
+        else:
+            raise ValueError(f"Unknown export format: {fmt}")
+    return count
+
+def export_in_background(records, path, fmt=None, compress=None, on_done=None):
+    """Runs export_records on a worker thread; on_done(count, error) is called from that thread"""
+    def run():
+        try:
+            count = export_records(records, path, fmt, compress)
+        except Exception as e:
+            if on_done:
+                on_done(0, e)
+            return
+        if on_done:
+            on_done(count, None)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
@@ -1,4 +1,6 @@
 # Modified fdc_gui.py
+import time
+_STARTED = time.perf_counter()
 import kivy
 kivy.require('2.3.1')
 
@@ -14,249 +16,228 @@ from kivy.uix.tabbedpanel import TabbedPanel, TabbedPanelItem
 from kivy.clock import Clock
 from kivy.core.window import Window
 from kivy.uix.checkbox import CheckBox
+from kivy.graphics import Color, InstructionGroup, Line, PopMatrix, PushMatrix, Rectangle, Translate
+from kivy.core.text import Label as CoreLabel
 import datetime
-import json
-import os
-
-class FDCController:
-    def __init__(self, model_type, mode, zones):
-        self.model_type = model_type
-        self.mode = mode
-        self.zones = zones
-        self.damper_positions = {i: 'closed' for i in range(1, zones+1)}
-        self.alarm_active = {i: False for i in range(1, zones+1)}
-        self.smoke_alarms = {i: False for i in range(1, zones+1)}
-        self.thermal_alarms = {i: False for i in range(1, zones+1)}
-        self.external_alarms = {i: False for i in range(1, zones+1)}
-        self.temp_sensor = {i: 20 for i in range(1, zones+1)}
-        self.zone_names = {i: f"Zone {i}" for i in range(1, zones+1)}
-        self.led_status = 'OFF'
-        self.relay_state = 'OPEN'
-        self.logs = {i: [] for i in range(1, zones+1)}
-        self.test_mode = False
-        self.auto_test_enabled = False
-        self.auto_test_interval_hours = 24
-        self.auto_test_hour = 0
-        self.auto_test_minute = 0
-        self.next_auto_test = None
-        self.test_reports = []
-
-    def get_status(self):
-        return {
-            'damper_positions': self.damper_positions,
-            'smoke_alarms': self.smoke_alarms,
-            'thermal_alarms': self.thermal_alarms,
-            'external_alarms': self.external_alarms,
-            'temp_sensor': self.temp_sensor,
-            'led_status': self.led_status,
-            'relay_state': self.relay_state,
-        }
-
-    def get_logs(self, zone):
-        return self.logs.get(zone, [])
-
-    def get_test_reports(self):
-        return self.test_reports
-
-    def trigger_alarm(self, type, zone):
-        if type == 'smoke':
-            self.smoke_alarms[zone] = True
-            msg = "Smoke alarm triggered"
-        elif type == 'thermal':
-            self.thermal_alarms[zone] = True
-            msg = "Thermal alarm triggered"
-        elif type == 'external':
-            self.external_alarms[zone] = True
-            msg = "External alarm triggered"
-        self.alarm_active[zone] = True
-        ts = datetime.datetime.now()
-        self.logs[zone].append((ts, msg))
-        self._update_leds()
-        self._update_relay()
-
-    def _set_working_position(self):
-        pass
-
-    def _update_leds(self):
-        any_alarm = any(self.alarm_active.values())
-        if self.test_mode or any_alarm:
-            self.led_status = 'FLASH'
-        else:
-            self.led_status = 'OFF'
-
-    def _update_relay(self):
-        any_alarm = any(self.alarm_active.values())
-        if any_alarm:
-            self.relay_state = 'CLOSED'
-        else:
-            self.relay_state = 'OPEN'
-
-    def _update_analog_out(self):
-        pass
-
-    def perform_full_test(self):
-        ts = datetime.datetime.now()
-        report = {'timestamp': ts, 'zones': {}, 'status': 'PASSED'}
-        if any(self.alarm_active.values()):
-            for i in range(1, self.zones + 1):
-                self.logs[i].append((ts, "Test failed: Active alarms detected"))
-                report['zones'][i] = ["Failed: Active alarms detected"]
-                report['status'] = 'FAILED'
-            self.test_reports.append(report)
-            for i in range(1, self.zones + 1):
-                self.logs[i].append((ts, f"Test Report - Status: {report['status']}, Zone {i}: {report['zones'][i][0]}"))
-            return
-        self.test_mode = True
-        self._update_leds()
-        for i in range(1, self.zones + 1):
-            self.damper_positions[i] = 'closed'
-            self.logs[i].append((ts, "Full test started: Damper closed"))
-            report['zones'][i] = ["Damper closed"]
-        for i in range(1, self.zones + 1):
-            self.damper_positions[i] = 'open'
-            self.logs[i].append((ts, "Full test: Damper opened"))
-            report['zones'][i].append("Damper opened")
-        for i in range(1, self.zones + 1):
-            self.damper_positions[i] = 'closed'
-            self.logs[i].append((ts, "Full test: Damper closed again"))
-            report['zones'][i].append("Damper closed again")
-        for i in range(1, self.zones + 1):
-            self.logs[i].append((ts, "Full test passed"))
-            report['zones'][i].append("Test passed")
-        self.test_mode = False
-        self._set_working_position()
-        self._update_leds()
-        self.test_reports.append(report)
-        for i in range(1, self.zones + 1):
-            self.logs[i].append((ts, f"Test Report - Status: {report['status']}, Zone {i}: {', '.join(report['zones'][i])}"))
-        if len(self.test_reports) > 50:
-            self.test_reports.pop(0)
-
-    def _schedule_next_auto_test(self):
-        now = datetime.datetime.now()
-        next_time = now.replace(hour=self.auto_test_hour, minute=self.auto_test_minute, second=0, microsecond=0)
-        interval = datetime.timedelta(hours=self.auto_test_interval_hours)
-        while next_time <= now:
-            next_time += interval
-        self.next_auto_test = next_time
-        ts = datetime.datetime.now()
-        for i in range(1, self.zones + 1):
-            self.logs[i].append((ts, f"Next auto test scheduled at {next_time.strftime('%Y-%m-%d %H:%M:%S')}"))
-
-    def set_auto_test_params(self, enabled, interval, hour, minute):
-        self.auto_test_enabled = enabled
-        self.auto_test_interval_hours = max(1, interval)
-        self.auto_test_hour = hour % 24
-        self.auto_test_minute = minute % 60
-        ts = datetime.datetime.now()
-        status = "enabled" if enabled else "disabled"
-        for i in range(1, self.zones + 1):
-            self.logs[i].append((ts, f"Auto test {status}: Interval {interval}h, Time {hour:02d}:{minute:02d}"))
-        if enabled:
-            self._schedule_next_auto_test()
-
-    def save_state(self, file_path):
-        state = {
-            'model_type': self.model_type,
-            'mode': self.mode,
-            'zone_names': {str(k): v for k, v in self.zone_names.items()},
-            'damper_positions': {str(k): v for k, v in self.damper_positions.items()},
-            'alarm_active': {str(k): v for k, v in self.alarm_active.items()},
-            'smoke_alarms': {str(k): v for k, v in self.smoke_alarms.items()},
-            'thermal_alarms': {str(k): v for k, v in self.thermal_alarms.items()},
-            'external_alarms': {str(k): v for k, v in self.external_alarms.items()},
-            'temp_sensor': {str(k): v for k, v in self.temp_sensor.items()},
-            'logs': {str(k): [(ts.isoformat(), msg) for ts, msg in v] for k, v in self.logs.items()},
-            'test_mode': self.test_mode,
-            'auto_test_enabled': self.auto_test_enabled,
-            'auto_test_interval_hours': self.auto_test_interval_hours,
-            'auto_test_hour': self.auto_test_hour,
-            'auto_test_minute': self.auto_test_minute,
-            'next_auto_test': self.next_auto_test.isoformat() if self.next_auto_test else None,
-            'test_reports': [{'timestamp': r['timestamp'].isoformat(), 'zones': r['zones'], 'status': r['status']} for r in self.test_reports]
-        }
-        with open(file_path, 'w') as f:
-            json.dump(state, f)
-
-    def load_state(self, file_path):
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                state = json.load(f)
-            self.model_type = state.get('model_type', self.model_type)
-            self.mode = state.get('mode', self.mode)
-            self.zone_names = {int(k): v for k, v in state.get('zone_names', {}).items()}
-            self.damper_positions = {int(k): v for k, v in state.get('damper_positions', {}).items()}
-            self.alarm_active = {int(k): v for k, v in state.get('alarm_active', {}).items()}
-            self.smoke_alarms = {int(k): v for k, v in state.get('smoke_alarms', {}).items()}
-            self.thermal_alarms = {int(k): v for k, v in state.get('thermal_alarms', {}).items()}
-            self.external_alarms = {int(k): v for k, v in state.get('external_alarms', {}).items()}
-            self.temp_sensor = {int(k): v for k, v in state.get('temp_sensor', {}).items()}
-            self.logs = {int(k): [(datetime.datetime.fromisoformat(ts), msg) for ts, msg in v] for k, v in state.get('logs', {}).items()}
-            self.zones = max(self.zone_names.keys() or [0])
-            self.test_mode = state.get('test_mode', False)
-            self.auto_test_enabled = state.get('auto_test_enabled', False)
-            self.auto_test_interval_hours = state.get('auto_test_interval_hours', 24)
-            self.auto_test_hour = state.get('auto_test_hour', 0)
-            self.auto_test_minute = state.get('auto_test_minute', 0)
-            self.next_auto_test = datetime.datetime.fromisoformat(state['next_auto_test']) if state.get('next_auto_test') else None
-            self.test_reports = [{'timestamp': datetime.datetime.fromisoformat(r['timestamp']), 'zones': r['zones'], 'status': r['status']} for r in state.get('test_reports', [])]
+import threading
+from fdc_archive import PAGE_SIZE, Archive, cursor
+from fdc_core import FDCController, record_startup_metric
+from fdc_export import export_in_background, gui_records
+from fdc_recorder import lttb
 
 Window.clearcolor = (0.12, 0.12, 0.12, 1)
 
-class ZoneCard(Button):
-    def __init__(self, zone_number, select_callback, name=None, **kwargs):
-        super().__init__(**kwargs)
-        self.zone_number = zone_number
+class ZoneGrid(Widget):
+    """
+    All zones drawn on one canvas, one cell (background rectangle plus a name texture) per zone.
+    Cells are placed once per layout change and shifted with a single Translate when the grid
+    moves, status changes recolor only the affected cells, and the blink timer touches only
+    alarmed cells.
+    """
+    CELL_HEIGHT = 50
+    MIN_CELL_WIDTH = 120
+    SPACING = 5
+    base_color = (0.2,0.2,0.2,1)
+    selected_color = (0.2,0.6,0.9,1)
+    alarm_color = (1,0.2,0.2,1)
+
+    def __init__(self, select_callback, **kwargs):
+        super().__init__(size_hint_y=None, **kwargs)
         self.select_callback = select_callback
-        self.name = name if name else f"Zone {zone_number}"
-        self.text = self.name
-        self.size_hint_y = None
-        self.height = 50
-        self.background_normal = ''
-        self.color = (1,1,1,1)
-        self.font_size = 18
-        self.on_press = lambda: self.select_callback(self.zone_number)
-        self.base_color = (0.2,0.2,0.2,1)
-        self.selected_color = (0.2,0.6,0.9,1)
-        self.alarm_color = (1,0.2,0.2,1)
-        self.is_selected = False
-        self.has_alarm = False
+        self.cells = {}  # zone -> (InstructionGroup, background Color, background Rectangle, label Rectangle)
+        self.order = []  # Zones in display order
+        self.selected = None
+        self.alarmed = set()
         self.blink_state = False
-        self.background_color = self.base_color
-        self.on_touch_down_original = self.on_touch_down
-        self.on_touch_down = self._touch_down_override
-
-    def _touch_down_override(self, touch):
+        self.cols = 1
+        self.cell_width = self.MIN_CELL_WIDTH
+        with self.canvas:
+            PushMatrix()
+            self._translate = Translate(0, 0)
+        self._cell_group = InstructionGroup()
+        self.canvas.add(self._cell_group)
+        self.canvas.add(PopMatrix())
+        self.bind(width=lambda *a: self._layout(), pos=self._on_pos)
+        Clock.schedule_interval(self._blink, 0.5)
+
+    def _on_pos(self, *args):
+        self._translate.xy = self.pos
+
+    def add_zone(self, zone, name=None):
+        label = CoreLabel(text=name or f"Zone {zone}", font_size=18)
+        label.refresh()
+        group = InstructionGroup()
+        color = Color(*self.base_color)
+        background = Rectangle()
+        group.add(color)
+        group.add(background)
+        group.add(Color(1, 1, 1, 1))
+        text = Rectangle(texture=label.texture, size=label.texture.size)
+        group.add(text)
+        self._cell_group.add(group)
+        self.cells[zone] = (group, color, background, text)
+        self.order.append(zone)
+        self._layout()
+
+    def remove_zone(self, zone):
+        cell = self.cells.pop(zone, None)
+        if cell is None:
+            return
+        self._cell_group.remove(cell[0])
+        self.order.remove(zone)
+        self.alarmed.discard(zone)
+        if self.selected == zone:
+            self.selected = None
+        self._layout()
+
+    def _layout(self):
+        pitch = self.MIN_CELL_WIDTH + self.SPACING
+        self.cols = max(1, int((self.width + self.SPACING) // pitch))
+        self.cell_width = max(1, (self.width - self.SPACING * (self.cols - 1)) / self.cols)
+        rows = -(-len(self.order) // self.cols)
+        self.height = max(0, rows * (self.CELL_HEIGHT + self.SPACING) - self.SPACING)
+        for i, zone in enumerate(self.order):
+            _, _, background, text = self.cells[zone]
+            row, col = divmod(i, self.cols)
+            x = col * (self.cell_width + self.SPACING)
+            y = self.height - (row + 1) * self.CELL_HEIGHT - row * self.SPACING
+            background.pos = (x, y)
+            background.size = (self.cell_width, self.CELL_HEIGHT)
+            text.pos = (x + (self.cell_width - text.size[0]) / 2, y + (self.CELL_HEIGHT - text.size[1]) / 2)
+
+    def _paint(self, zone):
+        if zone == self.selected:
+            color = self.selected_color
+        elif zone in self.alarmed:
+            color = self.alarm_color
+        else:
+            color = self.base_color
+        self.cells[zone][1].rgba = color
+
+    def set_selected(self, zone):
+        previous, self.selected = self.selected, zone
+        for z in (previous, zone):
+            if z in self.cells:
+                self._paint(z)
+
+    def update_statuses(self, alarmed):
+        """Recolors only the cells whose alarm state differs from the last call"""
+        alarmed = set(alarmed) & self.cells.keys()
+        changed = alarmed ^ self.alarmed
+        self.alarmed = alarmed
+        for zone in changed:
+            self._paint(zone)
+
+    def _blink(self, dt):
+        if not self.alarmed:
+            return
+        self.blink_state = not self.blink_state
+        color = self.alarm_color if self.blink_state else self.base_color
+        for zone in self.alarmed:
+            if zone != self.selected:
+                self.cells[zone][1].rgba = color
+
+    def zone_at(self, x, y):
+        """Zone whose cell contains the widget-local point, or None"""
+        col = int(x // (self.cell_width + self.SPACING))
+        row = int((self.height - y) // (self.CELL_HEIGHT + self.SPACING))
+        if col >= self.cols or row < 0 or x - col * (self.cell_width + self.SPACING) > self.cell_width:
+            return None
+        index = row * self.cols + col
+        return self.order[index] if index < len(self.order) else None
+
+    def on_touch_down(self, touch):
+        if not self.collide_point(*touch.pos):
+            return super().on_touch_down(touch)
         if hasattr(touch, 'button') and touch.button == 'right':
             return True
-        return self.on_touch_down_original(touch)
-
-    def set_selected(self, selected):
-        self.is_selected = selected
-        self.update_color()
-
-    def set_status(self, has_alarm):
-        self.has_alarm = has_alarm
-        self.update_color()
-
-    def blink(self, dt):
-        if self.has_alarm and not self.is_selected:
-            self.blink_state = not self.blink_state
-            self.background_color = self.alarm_color if self.blink_state else self.base_color
-        else:
-            self.update_color()
-
-    def update_color(self):
-        if self.is_selected:
-            self.background_color = self.selected_color
-        elif self.has_alarm:
-            self.background_color = self.alarm_color
-        else:
-            self.background_color = self.base_color
-
-    def set_name(self, name):
-        self.name = name
-        self.text = name
+        zone = self.zone_at(touch.x - self.x, touch.y - self.y)
+        if zone is not None:
+            self.select_callback(zone)
+        return True
+
+class TrendChart(Widget):
+    """
+    Temperature, alarm and damper trend of one zone. The canvas holds a fixed set of Line
+    instructions whose points are replaced in place; series are decimated to about one point per pixel.
+    """
+    def __init__(self, controller, window=24 * 3600, **kwargs):
+        super().__init__(**kwargs)
+        self.controller = controller
+        self.window = window  # Seconds shown, ending now
+        self.zone = None
+        self._drawn_key = None
+        with self.canvas:
+            Color(0.16, 0.16, 0.16, 1)
+            self.background = Rectangle()
+            Color(0.5, 0.5, 0.5, 1)
+            self.limit_line = Line(width=1)  # 72°C thermal alarm threshold
+            Color(1, 0.6, 0.2, 1)
+            self.temp_line = Line(width=1.5)
+            Color(1, 0.2, 0.2, 1)
+            self.alarm_line = Line(width=1.2)
+            Color(0.2, 0.8, 0.3, 1)
+            self.damper_line = Line(width=1.2)
+        self.bind(pos=self._on_layout, size=self._on_layout)
+
+    def _on_layout(self, *args):
+        self._drawn_key = None
+        self.show(self.zone)
+
+    def set_window(self, seconds):
+        self.window = seconds
+        self._drawn_key = None
+        self.show(self.zone)
+
+    def show(self, zone):
+        """Redraws only if the zone, its trend data, the layout or the visible range (to a pixel) changed"""
+        self.zone = zone
+        width = max(int(self.width), 3)
+        now = time.time()
+        key = (zone, self.controller.trend_version, self.window, tuple(self.pos), tuple(self.size),
+               int(now * width / self.window))
+        if key == self._drawn_key:
+            return
+        self._drawn_key = key
+        self.background.pos = self.pos
+        self.background.size = self.size
+        if zone is None:
+            for line in (self.limit_line, self.temp_line, self.alarm_line, self.damper_line):
+                line.points = []
+            return
+        start = now - self.window
+        h = self.height
+        # Alarm strip on top, damper strip below it, temperature in the lower 70%
+        temp_band = (self.y, self.y + h * 0.7)
+        damper_band = (self.y + h * 0.74, self.y + h * 0.84)
+        alarm_band = (self.y + h * 0.88, self.y + h * 0.98)
+        times, temps = self.controller.get_trend(zone, 'temp', start, now, buckets=width)
+        lo, hi = min([0] + temps), max([100] + temps)
+        self.temp_line.points = self._points(times, temps, start, now, lo, hi, temp_band, width)
+        limit_y = temp_band[0] + (72 - lo) * (temp_band[1] - temp_band[0]) / (hi - lo)
+        self.limit_line.points = [self.x, limit_y, self.right, limit_y]
+        for signal, line, band in (('alarm', self.alarm_line, alarm_band), ('damper', self.damper_line, damper_band)):
+            times, values = self.controller.get_trend(zone, signal, start, now, buckets=width)
+            line.points = self._points(times, values, start, now, 0, 1, band, width)
+
+    def _points(self, times, values, start, end, lo, hi, band, max_points):
+        """Holds each sample until the next one (or end), decimates with LTTB and maps to [x, y, ...]"""
+        if not times:
+            return []
+        step_t, step_v = [times[0]], [values[0]]
+        for i in range(1, len(times)):
+            step_t.extend((times[i], times[i]))
+            step_v.extend((values[i - 1], values[i]))
+        step_t.append(end)
+        step_v.append(values[-1])
+        step_t, step_v = lttb(step_t, step_v, max_points)
+        sx = self.width / (end - start)
+        sy = (band[1] - band[0]) / (hi - lo)
+        points = []
+        for t, v in zip(step_t, step_v):
+            points.append(self.x + (max(t, start) - start) * sx)
+            points.append(band[0] + (v - lo) * sy)
+        return points
 
 class ZoneInfo(BoxLayout):
     def __init__(self, controller, **kwargs):
@@ -267,7 +248,13 @@ class ZoneInfo(BoxLayout):
         self.info_container = BoxLayout(orientation='vertical', spacing=20, size_hint=(1, None))
         self.info_container.bind(minimum_height=self.info_container.setter('height'))
         self.add_widget(self.info_container)
-        self.add_widget(Widget(size_hint_y=0.2))
+        window_box = BoxLayout(size_hint_y=None, height=40, spacing=5)
+        for label, seconds in (('1h', 3600), ('24h', 24 * 3600), ('7d', 7 * 24 * 3600)):
+            window_box.add_widget(Button(text=label, background_color=(0.3,0.7,1,1),
+                                         on_press=lambda x, seconds=seconds: self.trend_chart.set_window(seconds)))
+        self.add_widget(window_box)
+        self.trend_chart = TrendChart(controller, size_hint_y=0.6)
+        self.add_widget(self.trend_chart)
         for key in ['Damper', 'Smoke', 'Thermal', 'External', 'Temperature', 'LED', 'Relay']:
             lbl = Label(text="", font_size=36, color=(1,1,1,1), size_hint_y=None, height=60)
             self.info_labels[key] = lbl
@@ -307,6 +294,7 @@ class ZoneInfo(BoxLayout):
         relay = status['relay_state']
         self.info_labels['Relay'].text = f"Relay: {relay}"
         self.info_labels['Relay'].color = (0,1,0,1) if relay=='CLOSED' else (1,0,0,1)
+        self.trend_chart.show(z)
 
 class LogItem(Button):
     def __init__(self, text, select_callback, **kwargs):
@@ -345,8 +333,12 @@ class LogPanel(BoxLayout):
         self.log_box.bind(minimum_height=self.log_box.setter('height'))
         self.scroll.add_widget(self.log_box)
         self.add_widget(self.scroll)
-        save_btn = Button(text='Save Logs', size_hint_y=None, height=50, background_color=(0.3,0.7,1,1), on_press=self.save_logs)
-        self.add_widget(save_btn)
+        button_box = BoxLayout(size_hint_y=None, height=50, spacing=5)
+        save_btn = Button(text='Save Logs', background_color=(0.3,0.7,1,1), on_press=self.save_logs)
+        export_btn = Button(text='Export All Zones', background_color=(0.3,0.7,1,1), on_press=self.export_all)
+        button_box.add_widget(save_btn)
+        button_box.add_widget(export_btn)
+        self.add_widget(button_box)
         self.displayed_texts = []
         self.displayed_raw = []
         self.selected_item = None
@@ -372,6 +364,13 @@ class LogPanel(BoxLayout):
         popup = Popup(title='Saved', content=Label(text=f"Logs saved to {file_name}"), size_hint=(0.4,0.2))
         popup.open()
 
+    def export_all(self, instance):
+        file_name = f"fdc_logs_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv.gz"
+        def done(count, error):
+            text = f"Export failed: {error}" if error else f"Exported {count} records to {file_name}"
+            Clock.schedule_once(lambda dt: Popup(title='Export', content=Label(text=text), size_hint=(0.5,0.2)).open())
+        export_in_background(gui_records(self.controller), file_name, on_done=done)
+
     def _format_entry_to_text(self, entry):
         if entry is None:
             return "None"
@@ -564,24 +563,60 @@ class TestPanel(BoxLayout):
             pass
 
     def show_reports(self, instance):
-        reports = self.controller.get_test_reports()
-        if not reports:
+        # Wait for a test that just finished off the UI thread, then build the popup back on it
+        archive = self.controller.archive
+        def flushed():
+            archive.flush(timeout=2)
+            Clock.schedule_once(lambda dt: self._open_reports(archive))
+        threading.Thread(target=flushed, daemon=True).start()
+
+    def _open_reports(self, archive):
+        # Pages come from indexed archive queries, PAGE_SIZE reports at a time, newest first
+        total = archive.count_reports()
+        if not total:
             popup = Popup(title='No Reports', content=Label(text="No test reports available."), size_hint=(0.4,0.2))
             popup.open()
             return
+        content = BoxLayout(orientation='vertical', spacing=5)
         scroll = ScrollView()
         report_box = BoxLayout(orientation='vertical', size_hint_y=None, spacing=5, padding=10)
         report_box.bind(minimum_height=report_box.setter('height'))
-        for report in reversed(reports[-10:]):
-            ts = report['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
-            status = report['status']
-            lbl = Label(text=f"{ts} - {status}", size_hint_y=None, height=30, color=(1,1,1,1))
-            report_box.add_widget(lbl)
-            for zone, actions in report['zones'].items():
-                for action in actions:
-                    report_box.add_widget(Label(text=f"  Zone {zone}: {action}", size_hint_y=None, height=30, color=(0.8,0.8,0.8,1)))
         scroll.add_widget(report_box)
-        popup = Popup(title='Test Reports', content=scroll, size_hint=(0.6,0.6))
+        content.add_widget(scroll)
+        nav_box = BoxLayout(size_hint_y=None, height=50, spacing=5)
+        newer_btn = Button(text='< Newer', size_hint_x=0.3)
+        page_label = Label(size_hint_x=0.4)
+        older_btn = Button(text='Older >', size_hint_x=0.3)
+        nav_box.add_widget(newer_btn)
+        nav_box.add_widget(page_label)
+        nav_box.add_widget(older_btn)
+        content.add_widget(nav_box)
+        cursors = [None]  # before= cursor of each page visited, so Newer can step back
+        page = [0]
+
+        def show_page(n):
+            reports = archive.reports(PAGE_SIZE, before=cursors[n])
+            if reports and len(cursors) == n + 1:
+                cursors.append(cursor(reports[-1]))
+            page[0] = n
+            report_box.clear_widgets()
+            for report in reports:
+                ts = report['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
+                status = report['status']
+                lbl = Label(text=f"{ts} - {status}", size_hint_y=None, height=30, color=(1,1,1,1))
+                report_box.add_widget(lbl)
+                for zone, actions in report['zones'].items():
+                    for action in actions:
+                        report_box.add_widget(Label(text=f"  Zone {zone}: {action}", size_hint_y=None, height=30, color=(0.8,0.8,0.8,1)))
+            page_label.text = f"Page {n + 1} of {-(-total // PAGE_SIZE)}"
+            newer_btn.disabled = n == 0
+            older_btn.disabled = (n + 1) * PAGE_SIZE >= total
+            scroll.scroll_y = 1
+
+        newer_btn.bind(on_press=lambda x: show_page(page[0] - 1))
+        older_btn.bind(on_press=lambda x: show_page(page[0] + 1))
+        show_page(0)
+        popup = Popup(title=f'Test Reports ({total})', content=content, size_hint=(0.6,0.6))
         popup.open()
 
 class FDCGUI(BoxLayout):
@@ -589,14 +624,12 @@ class FDCGUI(BoxLayout):
         super().__init__(orientation='horizontal', **kwargs)
         self.controller = controller
         self.current_zone = None
-        self.zone_buttons = {}
         if not hasattr(self.controller, 'logs'):
             self.controller.logs = {z: [] for z in self.controller.zone_names.keys()}
         self.left_panel = BoxLayout(orientation='vertical', size_hint_x=0.25, spacing=10)
         self.scroll = ScrollView()
-        self.zone_panel = BoxLayout(orientation='vertical', spacing=5, size_hint_y=None)
-        self.zone_panel.bind(minimum_height=self.zone_panel.setter('height'))
-        self.scroll.add_widget(self.zone_panel)
+        self.zone_grid = ZoneGrid(self.select_zone)
+        self.scroll.add_widget(self.zone_grid)
         self.left_panel.add_widget(self.scroll)
         control_box = BoxLayout(size_hint_y=None, height=50, spacing=5)
         add_btn = Button(text='Add Zone', background_color=(0.3,1,0.3,1), on_press=lambda x:self.prompt_add_zone())
@@ -630,7 +663,6 @@ class FDCGUI(BoxLayout):
         if zones_list:
             self.current_zone = min(zones_list)
         Clock.schedule_interval(lambda dt:self.update_info(), 1)
-        Clock.schedule_interval(lambda dt:self.blink_zones(dt), 0.5)
         Clock.schedule_interval(lambda dt: self.save_state(), 30)
         Clock.schedule_interval(lambda dt: self.check_auto_test(dt), 60)
         self.bottom_controls = BoxLayout(size_hint_y=None, height=60, spacing=10)
@@ -649,9 +681,7 @@ class FDCGUI(BoxLayout):
         self.info_panel.add_widget(self.bottom_controls)
 
     def check_auto_test(self, dt):
-        if self.controller.auto_test_enabled and self.controller.next_auto_test and datetime.datetime.now() >= self.controller.next_auto_test:
-            self.controller.perform_full_test()
-            self.controller._schedule_next_auto_test()
+        self.controller.check_auto_test()
 
     def trigger_smoke(self):
         if self.current_zone is not None:
@@ -672,13 +702,11 @@ class FDCGUI(BoxLayout):
         self.controller.save_state('fdc_state.json')
 
     def add_zone_button(self, zone_number, name=None):
-        btn = ZoneCard(zone_number, self.select_zone, name=name)
-        self.zone_buttons[zone_number] = btn
-        self.zone_panel.add_widget(btn)
+        self.zone_grid.add_zone(zone_number, name=name)
         self.update_selection()
 
     def prompt_add_zone(self):
-        new_zone = max(self.zone_buttons.keys() or [0]) + 1
+        new_zone = max(self.zone_grid.cells.keys() or [0]) + 1
         box = BoxLayout(orientation='vertical', padding=10, spacing=10)
         ti = TextInput(text=f"Zone {new_zone}", multiline=False, size_hint_y=None, height=40)
         box.add_widget(ti)
@@ -693,14 +721,7 @@ class FDCGUI(BoxLayout):
         def add_zone_action(instance):
             name = ti.text.strip() or f"Zone {new_zone}"
             try:
-                self.controller.zone_names[new_zone] = name
-                self.controller.damper_positions[new_zone] = 'closed'
-                self.controller.alarm_active[new_zone] = False
-                self.controller.smoke_alarms[new_zone] = False
-                self.controller.thermal_alarms[new_zone] = False
-                self.controller.external_alarms[new_zone] = False
-                self.controller.temp_sensor[new_zone] = 20
-                self.controller.logs[new_zone] = []
+                self.controller.add_zone(new_zone, name)
             except Exception:
                 pass
             self.add_zone_button(new_zone, name=name)
@@ -712,26 +733,15 @@ class FDCGUI(BoxLayout):
         cancel_btn.bind(on_press=lambda x: popup.dismiss())
 
     def remove_zone(self):
-        if self.zone_buttons:
+        if self.zone_grid.cells:
             zone_to_remove = self.current_zone
+            self.zone_grid.remove_zone(zone_to_remove)
             try:
-                btn = self.zone_buttons.pop(zone_to_remove)
-                self.zone_panel.remove_widget(btn)
+                self.controller.remove_zone(zone_to_remove)
             except Exception:
                 pass
-            try:
-                self.controller.zone_names.pop(zone_to_remove, None)
-                self.controller.damper_positions.pop(zone_to_remove, None)
-                self.controller.alarm_active.pop(zone_to_remove, None)
-                self.controller.smoke_alarms.pop(zone_to_remove, None)
-                self.controller.thermal_alarms.pop(zone_to_remove, None)
-                self.controller.external_alarms.pop(zone_to_remove, None)
-                self.controller.temp_sensor.pop(zone_to_remove, None)
-                self.controller.logs.pop(zone_to_remove, None)
-            except Exception:
-                pass
-            if self.zone_buttons:
-                available_zones = sorted(self.zone_buttons.keys())
+            if self.zone_grid.cells:
+                available_zones = sorted(self.zone_grid.cells.keys())
                 closest = min(available_zones, key=lambda x: abs(x - zone_to_remove))
                 self.current_zone = closest
             else:
@@ -744,48 +754,33 @@ class FDCGUI(BoxLayout):
         self.update_selection()
 
     def update_selection(self):
-        for z, btn in self.zone_buttons.items():
-            btn.set_selected(z == self.current_zone)
+        self.zone_grid.set_selected(self.current_zone)
 
     def update_info(self):
+        # The grid shows every zone's status, so it refreshes whether or not a zone is selected
         if self.current_zone is None:
             for lbl in self.info_panel.info_labels.values():
                 lbl.text = ""
-            return
-        try:
-            self.info_panel.update_info(self.current_zone)
-        except Exception:
-            pass
+            self.info_panel.trend_chart.show(None)
+        else:
+            try:
+                self.info_panel.update_info(self.current_zone)
+            except Exception:
+                pass
         try:
             status = self.controller.get_status()
         except Exception:
             status = {}
-        for z, btn in self.zone_buttons.items():
-            try:
-                has_alarm = status.get('smoke_alarms', {}).get(z, False) or status.get('thermal_alarms', {}).get(z, False) or status.get('external_alarms', {}).get(z, False)
-            except Exception:
-                has_alarm = False
-            btn.set_status(has_alarm)
-
-    def blink_zones(self, dt):
-        for btn in self.zone_buttons.values():
-            btn.blink(dt)
+        alarmed = set()
+        for key in ('smoke_alarms', 'thermal_alarms', 'external_alarms'):
+            alarmed.update(z for z, active in status.get(key, {}).items() if active)
+        self.zone_grid.update_statuses(alarmed)
 
     def reset_zone_alarms(self):
         if self.current_zone is None:
             return
         try:
-            self.controller.alarm_active[self.current_zone] = False
-            self.controller.smoke_alarms[self.current_zone] = False
-            self.controller.thermal_alarms[self.current_zone] = False
-            self.controller.external_alarms[self.current_zone] = False
-            self.controller._set_working_position()
-            self.controller._update_leds()
-            self.controller._update_relay()
-            self.controller._update_analog_out()
-            ts = datetime.datetime.now()
-            msg = "Alarm deactivated"
-            self.controller.logs[self.current_zone].append((ts, msg))
+            self.controller.reset_zone_alarms(self.current_zone)
         except Exception:
             pass
         self.save_state()
@@ -794,9 +789,7 @@ class FDCGUI(BoxLayout):
         if self.current_zone is None:
             return
         try:
-            self.controller.temp_sensor[self.current_zone] += delta
-            if self.controller.temp_sensor[self.current_zone] > 72:
-                self.controller.trigger_alarm('thermal', self.current_zone)
+            self.controller.adjust_temperature(self.current_zone, delta)
         except Exception:
             pass
         self.save_state()
@@ -808,10 +801,15 @@ class FDCApp(App):
         controller = FDCController(model_type='FDC-2KJ', mode='fire', zones=0)
         save_file = 'fdc_state.json'
         controller.load_state(save_file)
+        controller.attach_archive(Archive())
         return FDCGUI(controller)
 
+    def on_start(self):
+        record_startup_metric('gui', time.perf_counter() - _STARTED)
+
     def on_stop(self):
         self.root.save_state()
+        self.root.controller.archive.close()
 
 if __name__ == '__main__':
-    FDCApp().run()
\ No newline at end of file
+    FDCApp().run()
@@ -0,0 +1,43 @@
+# fdc_headless.py
+# Runs the GUI controller's auto-test scheduler and persistence without Kivy or a window.
+import time
+_STARTED = time.perf_counter()
+import argparse
+from fdc_archive import DEFAULT_PATH as ARCHIVE_PATH, Archive
+from fdc_core import FDCController, record_startup_metric
+
+def run(state_file='fdc_state.json', check_interval=60, save_interval=30, once=False, archive_path=ARCHIVE_PATH):
+    controller = FDCController(model_type='FDC-2KJ', mode='fire', zones=0)
+    controller.load_state(state_file)
+    controller.attach_archive(Archive(archive_path))
+    record_startup_metric('headless', time.perf_counter() - _STARTED)
+    print(f"Headless FDC running with {len(controller.zone_names)} zones, next auto test: {controller.next_auto_test}")
+    next_check = next_save = time.monotonic()
+    try:
+        while True:
+            now = time.monotonic()
+            if now >= next_check:
+                if controller.check_auto_test():
+                    print(f"Auto test ran, next at {controller.next_auto_test}")
+                next_check = now + check_interval
+            if now >= next_save:
+                controller.save_state(state_file)
+                next_save = now + save_interval
+            if once:
+                break
+            time.sleep(max(0.0, min(next_check, next_save) - time.monotonic()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.save_state(state_file)
+        controller.archive.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless FDC auto-test scheduler")
+    parser.add_argument('--state', default='fdc_state.json')
+    parser.add_argument('--check-interval', type=float, default=60)
+    parser.add_argument('--save-interval', type=float, default=30)
+    parser.add_argument('--once', action='store_true', help="Check and save once, then exit")
+    parser.add_argument('--archive', default=ARCHIVE_PATH, help="SQLite archive of test reports and alarm events")
+    args = parser.parse_args()
+    run(args.state, args.check_interval, args.save_interval, args.once, args.archive)
@@ -0,0 +1,308 @@
+# fdc_recorder.py
+import bisect
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+
+CHUNK_SIZE = 4096  # Samples per chunk; full chunks are sealed (delta-encoded, zlib-compressed)
+TIME_SCALE = 1000  # Times are stored as integer milliseconds so delta encoding stays exact
+DECODE_CACHE = 64  # Recently decoded chunks kept across all series, so redraws of the same range skip zlib
+
+_decoded = OrderedDict()  # chunk -> (times, values)
+_decoded_lock = threading.Lock()
+
+class Series:
+    """
+    One signal as (time, value) samples in typed arrays. The open chunk is two arrays; sealed
+    chunks keep (first ms, last ms, min, max, count, blob) so range queries skip or summarize
+    whole chunks without decompressing them.
+    """
+
+    def __init__(self, typecode='f', chunk_size=CHUNK_SIZE):
+        self.typecode = typecode
+        self.chunk_size = chunk_size
+        self._times = array('q')
+        self._values = array(typecode)
+        self._sealed = []
+        self._sealed_ends = []  # Last ms of each sealed chunk, for bisect
+        self.count = 0
+        self.last = None  # (time, value) of the newest sample
+
+    def __len__(self):
+        return self.count
+
+    def append(self, t, value):
+        self._times.append(round(t * TIME_SCALE))
+        self._values.append(value)
+        self.count += 1
+        self.last = (t, value)
+        if len(self._times) >= self.chunk_size:
+            self._seal()
+
+    def _seal(self):
+        times, values = self._times, self._values
+        deltas = array('q', [times[0]])
+        deltas.extend(times[i] - times[i - 1] for i in range(1, len(times)))
+        blob = zlib.compress(deltas.tobytes() + values.tobytes())
+        self._sealed.append((times[0], times[-1], min(values), max(values), len(times), blob))
+        self._sealed_ends.append(times[-1])
+        self._times = array('q')
+        self._values = array(self.typecode)
+
+    def truncate(self, t):
+        """Drops the samples after t, e.g. after the simulated clock was rewound"""
+        ms = round(t * TIME_SCALE)
+        if not self._times or self._times[0] > ms:
+            self.count -= len(self._times)
+            self._times, self._values = array('q'), array(self.typecode)
+            i = bisect.bisect_right(self._sealed_ends, ms)
+            self.count -= sum(chunk[4] for chunk in self._sealed[i:])
+            if i < len(self._sealed) and self._sealed[i][0] <= ms:
+                # The chunk t falls in is reopened; its samples after t are cut below
+                times, values = self._decode(self._sealed[i])
+                self._times, self._values = array('q', times), array(self.typecode, values)
+                self.count += len(times)
+            del self._sealed[i:]
+            del self._sealed_ends[i:]
+        keep = bisect.bisect_right(self._times, ms)
+        self.count -= len(self._times) - keep
+        del self._times[keep:]
+        del self._values[keep:]
+        if self._times:
+            self.last = (self._times[-1] / TIME_SCALE, self._values[-1])
+        elif self._sealed:
+            self.last = (self._sealed[-1][1] / TIME_SCALE, self._decode(self._sealed[-1])[1][-1])
+        else:
+            self.last = None
+
+    def _decode(self, chunk):
+        with _decoded_lock:
+            if chunk in _decoded:
+                _decoded.move_to_end(chunk)
+                return _decoded[chunk]
+        count, blob = chunk[4], chunk[5]
+        raw = zlib.decompress(blob)
+        deltas = array('q')
+        deltas.frombytes(raw[:8 * count])
+        values = array(self.typecode)
+        values.frombytes(raw[8 * count:])
+        decoded = (list(accumulate(deltas)), values)
+        with _decoded_lock:
+            _decoded[chunk] = decoded
+            if len(_decoded) > DECODE_CACHE:
+                _decoded.popitem(last=False)
+        return decoded
+
+    def _chunks(self, lo, hi):
+        """Yields (first ms, last ms, min, max, loader) for chunks overlapping [lo, hi] ms"""
+        for i in range(bisect.bisect_left(self._sealed_ends, lo), len(self._sealed)):
+            chunk = self._sealed[i]
+            if chunk[0] > hi:
+                return
+            yield chunk[0], chunk[1], chunk[2], chunk[3], lambda chunk=chunk: self._decode(chunk)
+        if self._times and self._times[0] <= hi and self._times[-1] >= lo:
+            yield (self._times[0], self._times[-1], min(self._values), max(self._values),
+                   lambda: (self._times, self._values))
+
+    @staticmethod
+    def _bounds(start, end):
+        lo = float('-inf') if start is None else round(start * TIME_SCALE)
+        hi = float('inf') if end is None else round(end * TIME_SCALE)
+        return lo, hi
+
+    def query(self, start=None, end=None):
+        """Samples with start <= time <= end as (times, values) lists, oldest first"""
+        lo, hi = self._bounds(start, end)
+        out_times, out_values = [], []
+        for first, last, _, _, load in self._chunks(lo, hi):
+            times, values = load()
+            i = bisect.bisect_left(times, lo) if first < lo else 0
+            j = bisect.bisect_right(times, hi) if last > hi else len(times)
+            out_times.extend(t / TIME_SCALE for t in times[i:j])
+            out_values.extend(values[i:j])
+        return out_times, out_values
+
+    def value_at(self, t):
+        """Value of the newest sample at or before t, or None; decodes at most one chunk"""
+        ms = round(t * TIME_SCALE)
+        if self._times and self._times[0] <= ms:
+            return self._values[bisect.bisect_right(self._times, ms) - 1]
+        i = bisect.bisect_left(self._sealed_ends, ms)
+        if i < len(self._sealed) and self._sealed[i][0] <= ms:
+            times, values = self._decode(self._sealed[i])
+            return values[bisect.bisect_right(times, ms) - 1]
+        if i == 0:
+            return None
+        return self._decode(self._sealed[i - 1])[1][-1]
+
+    def downsample(self, start, end, buckets):
+        """
+        Min/max per time bucket over [start, end] as [(bucket start, min, max)], empty buckets
+        omitted. A sealed chunk that falls inside one bucket contributes its summary, so long
+        ranges cost about one step per chunk or bucket rather than per sample.
+        """
+        lo, hi = self._bounds(start, end)
+        width = (hi - lo) / buckets
+        mins = [None] * buckets
+        maxs = [None] * buckets
+
+        def put(b, vmin, vmax):
+            if mins[b] is None or vmin < mins[b]:
+                mins[b] = vmin
+            if maxs[b] is None or vmax > maxs[b]:
+                maxs[b] = vmax
+
+        def bucket(t):
+            return min(buckets - 1, int((t - lo) / width)) if width else 0
+
+        for first, last, vmin, vmax, load in self._chunks(lo, hi):
+            if first >= lo and last <= hi and bucket(first) == bucket(last):
+                put(bucket(first), vmin, vmax)
+                continue
+            times, values = load()
+            i = bisect.bisect_left(times, lo)
+            end = bisect.bisect_right(times, hi)
+            while i < end:
+                # One bucket's slice at a time, reduced by min()/max() over the array
+                b = bucket(times[i])
+                j = end if b == buckets - 1 else min(end, bisect.bisect_left(times, lo + (b + 1) * width, i))
+                j = max(j, i + 1)
+                part = values[i:j]
+                put(b, min(part), max(part))
+                i = j
+        return [((lo + b * width) / TIME_SCALE, mins[b], maxs[b]) for b in range(buckets) if mins[b] is not None]
+
+    def nbytes(self):
+        """Approximate storage size in bytes"""
+        sealed = sum(len(chunk[5]) for chunk in self._sealed)
+        return sealed + len(self._times) * self._times.itemsize + len(self._values) * self._values.itemsize
+
+class Recorder:
+    """
+    Trend recorder for a simulator FDCController, on the simulated clock (sim_seconds).
+    Signals: analog_out, relay (1 = CLOSED), damper.<zone> (1 = open) and temp.<zone>.
+    With interval=None a signal is sampled whenever its value changes; with an interval every
+    signal is sampled at each multiple of it, holding the value in effect at that time.
+    """
+
+    def __init__(self, interval=None, chunk_size=CHUNK_SIZE):
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.series = {}
+        self._current = {}  # Latest observed value per signal
+        self._next_tick = 0
+        self._lock = threading.Lock()
+
+    def attach(self, controller):
+        """
+        Samples the controller now and after every state change; each logged event also samples
+        the zone it concerns, so changes within a command keep their simulated time
+        """
+        controller.recorder = self
+        controller.log_listeners.append(lambda zone, entry: self.sample(controller, zone))
+        controller.state_listeners.append(self.sample)
+        self.sample(controller)
+
+    @staticmethod
+    def read(controller, zone=None):
+        """Current {signal: value} of the controller, or of the controller-wide signals and one zone"""
+        values = {'analog_out': controller.analog_out, 'relay': int(controller.relay_state == 'CLOSED')}
+        if zone is None:
+            zones = controller.damper_positions
+        else:
+            zones = [zone] if zone in controller.damper_positions else []
+        for z in zones:
+            values[f'damper.{z}'] = int(controller.damper_positions[z] == 'open')
+            values[f'temp.{z}'] = controller.temp_sensor[z]
+        return values
+
+    def _series(self, name):
+        series = self.series.get(name)
+        if series is None:
+            typecode = 'b' if name == 'relay' or name.startswith('damper.') else 'f'
+            series = self.series[name] = Series(typecode, self.chunk_size)
+        return series
+
+    def sample(self, controller, zone=None):
+        """Samples every signal, or with zone only the controller-wide ones and that zone's"""
+        now = controller.sim_seconds
+        values = self.read(controller, zone)
+        with self._lock:
+            if self.interval:
+                if not self._current:
+                    self._next_tick = -(-now // self.interval) * self.interval
+                # Ticks before now see the state from before this change
+                while self._next_tick < now:
+                    for name, value in self._current.items():
+                        self._series(name).append(self._next_tick, value)
+                    self._next_tick += self.interval
+                if zone is None:
+                    self._current = values
+                else:
+                    self._current.update(values)
+            else:
+                for name, value in values.items():
+                    series = self._series(name)
+                    if series.last is None or series.last[1] != value:
+                        series.append(now, value)
+
+    def rewind(self, controller):
+        """Drops every sample after the controller's sim_seconds, once its clock was set back, and samples it anew"""
+        now = controller.sim_seconds
+        with self._lock:
+            if self.interval:
+                # Only ticks before now were taken in the rewound timeline; the rest are taken again
+                self._next_tick = -(-now // self.interval) * self.interval
+                for series in self.series.values():
+                    series.truncate(self._next_tick - self.interval)
+                self._current = self.read(controller)
+                return
+            for series in self.series.values():
+                series.truncate(now)
+        self.sample(controller)
+
+    def signals(self):
+        return sorted(self.series)
+
+    def query(self, name, start=None, end=None):
+        with self._lock:
+            return self.series[name].query(start, end)
+
+    def downsample(self, name, start, end, buckets):
+        with self._lock:
+            return self.series[name].downsample(start, end, buckets)
+
+    def nbytes(self):
+        with self._lock:
+            return sum(series.nbytes() for series in self.series.values())
+
+def lttb(times, values, threshold):
+    """Largest-Triangle-Three-Buckets decimation to at most threshold points, keeping the visual shape"""
+    n = len(times)
+    if threshold >= n or threshold < 3:
+        return list(times), list(values)
+    out_t, out_v = [times[0]], [values[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        # Average of the next bucket is the third triangle vertex
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        span = next_end - next_start
+        avg_t = sum(times[next_start:next_end]) / span
+        avg_v = sum(values[next_start:next_end]) / span
+        at, av = times[a], values[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((at - avg_t) * (values[j] - av) - (at - times[j]) * (avg_v - av))
+            if area > best_area:
+                best, best_area = j, area
+        out_t.append(times[best])
+        out_v.append(values[best])
+        a = best
+    out_t.append(times[-1])
+    out_v.append(values[-1])
+    return out_t, out_v
@@ -0,0 +1,136 @@
+# fdc_regmap.py
+import mmap
+import struct
+import sys
+from multiprocessing import shared_memory
+
+MAGIC = b'FDCR'
+LAYOUT_VERSION = 1
+MODBUS_REGS = 1024  # Holding registers 0-1023
+BACNET_TYPES = ('AI', 'AV', 'BI', 'BO')
+BACNET_INSTANCES = 128  # Present values 0-127 per object type
+
+# Header: magic, layout version, seqlock counter, padding, controller version
+HEADER = struct.Struct('<4sIIIQ')
+SEQ = struct.Struct('<I')
+SEQ_OFFSET = 8
+MODBUS = struct.Struct(f'<{MODBUS_REGS}i')
+BACNET = struct.Struct(f'<{len(BACNET_TYPES) * BACNET_INSTANCES}d')
+MODBUS_OFFSET = HEADER.size
+BACNET_OFFSET = MODBUS_OFFSET + MODBUS.size
+SIZE = BACNET_OFFSET + BACNET.size
+DEFAULT_NAME = 'fdc_registers'
+
+class RegisterMap:
+    """
+    Writer side of the shared register image: a fixed layout in a shared_memory segment (name)
+    or an mmap-backed file (path). Each publish is wrapped in a seqlock: the counter is odd while
+    the image is being written, so readers retry instead of seeing a torn image.
+    """
+
+    def __init__(self, name=DEFAULT_NAME, path=None):
+        self.path = path
+        if path:
+            self._file = open(path, 'w+b')
+            self._file.truncate(SIZE)
+            self._mmap = mmap.mmap(self._file.fileno(), SIZE)
+            self.buf = memoryview(self._mmap)
+            self._shm = None
+        else:
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=SIZE)
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=name)
+            self.buf = self._shm.buf
+        HEADER.pack_into(self.buf, 0, MAGIC, LAYOUT_VERSION, 0, 0, 0)
+        self._seq = 0
+
+    def publish(self, controller):
+        """Copies the controller's registers and BACnet present values into the image"""
+        modbus = [0] * MODBUS_REGS
+        for reg, value in controller.modbus_registers.items():
+            if 0 <= reg < MODBUS_REGS:
+                modbus[reg] = int(value)
+        bacnet = [0.0] * (len(BACNET_TYPES) * BACNET_INSTANCES)
+        for t, obj_type in enumerate(BACNET_TYPES):
+            base = t * BACNET_INSTANCES
+            for instance, value in controller.bacnet_objects.get(obj_type, {}).items():
+                if 0 <= instance < BACNET_INSTANCES:
+                    bacnet[base + instance] = float(value)
+        self._seq += 1
+        SEQ.pack_into(self.buf, SEQ_OFFSET, self._seq)
+        MODBUS.pack_into(self.buf, MODBUS_OFFSET, *modbus)
+        BACNET.pack_into(self.buf, BACNET_OFFSET, *bacnet)
+        struct.pack_into('<Q', self.buf, 16, controller.version)
+        self._seq += 1
+        SEQ.pack_into(self.buf, SEQ_OFFSET, self._seq)
+
+    def close(self, unlink=True):
+        self.buf.release()
+        if self._shm:
+            self._shm.close()
+            if unlink:
+                self._shm.unlink()
+        else:
+            self._mmap.close()
+            self._file.close()
+
+class RegisterMapReader:
+    """Read side for any local process; never touches the simulator's command loop"""
+
+    def __init__(self, name=DEFAULT_NAME, path=None):
+        if path:
+            self._file = open(path, 'rb')
+            self._mmap = mmap.mmap(self._file.fileno(), SIZE, access=mmap.ACCESS_READ)
+            self.buf = memoryview(self._mmap)
+            self._shm = None
+        else:
+            if sys.version_info >= (3, 13):
+                self._shm = shared_memory.SharedMemory(name=name, track=False)
+            else:
+                self._shm = shared_memory.SharedMemory(name=name)
+                # Keep the resource tracker from unlinking the writer's segment when we exit
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(self._shm._name, 'shared_memory')
+            self.buf = self._shm.buf
+        magic, layout, _, _, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or layout != LAYOUT_VERSION:
+            raise ValueError("Not an FDC register map")
+
+    def _consistent(self, read):
+        while True:
+            before = SEQ.unpack_from(self.buf, SEQ_OFFSET)[0]
+            if before & 1:
+                continue
+            result = read()
+            if SEQ.unpack_from(self.buf, SEQ_OFFSET)[0] == before:
+                return result
+
+    def read_into(self, out):
+        """Copies the whole image into a preallocated bytearray of SIZE bytes without allocating"""
+        def read():
+            out[:] = self.buf
+        self._consistent(read)
+        return out
+
+    def read_registers(self, start, count=1):
+        """Holding registers start..start+count-1 as a tuple"""
+        fmt = struct.Struct(f'<{count}i')
+        return self._consistent(lambda: fmt.unpack_from(self.buf, MODBUS_OFFSET + 4 * start))
+
+    def snapshot(self):
+        """(controller version, all holding registers, {type: present values}) from one consistent image"""
+        def read():
+            version = struct.unpack_from('<Q', self.buf, 16)[0]
+            return version, MODBUS.unpack_from(self.buf, MODBUS_OFFSET), BACNET.unpack_from(self.buf, BACNET_OFFSET)
+        version, modbus, bacnet = self._consistent(read)
+        values = {t: bacnet[i * BACNET_INSTANCES:(i + 1) * BACNET_INSTANCES] for i, t in enumerate(BACNET_TYPES)}
+        return version, modbus, values
+
+    def close(self):
+        self.buf.release()
+        if self._shm:
+            self._shm.close()
+        else:
+            self._mmap.close()
+            self._file.close()
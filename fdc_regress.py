@@ -0,0 +1,167 @@
+# fdc_regress.py
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fdc_simulator import FDCController
+
+COMMANDS_FILE = 'commands.txt'  # One simulator command per line; blank lines and "#" comments are skipped
+EXPECTED_FILE = 'expected.json'  # Golden snapshot: any of "status", "logs", "registers", "output"
+CONFIG_FILE = 'config.json'  # Optional: model_type, mode, zones, rtc (ISO)
+SECTIONS = ('status', 'logs', 'registers', 'output')
+FLOAT_TOLERANCE = 1e-9
+
+def find_scenarios(corpus, pattern=None):
+    """Scenario directories under corpus (those holding a commands.txt), sorted by name"""
+    scenarios = []
+    for root, dirs, files in os.walk(corpus):
+        dirs.sort()
+        if COMMANDS_FILE in files and (not pattern or pattern in os.path.relpath(root, corpus)):
+            scenarios.append(root)
+    return scenarios
+
+def read_commands(path):
+    """The script's commands; an "exit" line ends the script, as it ends the simulator's input loop"""
+    commands = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.split()[0] == 'exit':
+                break
+            commands.append(line)
+    return commands
+
+def snapshot(controller, output):
+    """The comparable state after a run: status without its version counter, logs, non-zero registers, output lines"""
+    status = json.loads(controller.get_status_json())
+    status.pop('version', None)
+    return {
+        'status': status,
+        'logs': controller.query_logs(),
+        'registers': {str(reg): value for reg, value in sorted(controller.modbus_registers.items()) if value},
+        'output': output.splitlines(),
+    }
+
+def run_commands(commands, config=None):
+    """Runs commands through process_command on a fresh controller with a fixed RTC; returns the snapshot"""
+    config = config or {}
+    controller = FDCController(model_type=config.get('model_type', 'FDC-2KJ'), mode=config.get('mode', 'fire'),
+                               zones=config.get('zones', 2))
+    if 'rtc' in config:
+        controller.rtc = datetime.datetime.fromisoformat(config['rtc'])
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        for cmd in commands:
+            controller.process_command(cmd)
+    return snapshot(controller, out.getvalue())
+
+def diff(expected, actual, path='$'):
+    """Structural differences as 'path: expected != actual' lines; floats compare with a small tolerance"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        lines = []
+        for key in expected:
+            if key not in actual:
+                lines.append(f"{path}.{key}: missing")
+            else:
+                lines.extend(diff(expected[key], actual[key], f"{path}.{key}"))
+        lines.extend(f"{path}.{key}: unexpected {actual[key]!r}" for key in actual if key not in expected)
+        return lines
+    if isinstance(expected, list) and isinstance(actual, list):
+        lines = []
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            lines.extend(diff(e, a, f"{path}[{i}]"))
+        if len(expected) != len(actual):
+            lines.append(f"{path}: length {len(expected)} != {len(actual)}")
+        return lines
+    if isinstance(expected, float) or isinstance(actual, float):
+        if isinstance(expected, (int, float)) and isinstance(actual, (int, float)) and abs(expected - actual) <= FLOAT_TOLERANCE:
+            return []
+    if expected != actual:
+        return [f"{path}: {expected!r} != {actual!r}"]
+    return []
+
+def run_scenario(args):
+    """Runs one scenario directory; compares against (or with update, rewrites) its expected.json"""
+    path, update = args
+    started = time.perf_counter()
+    result = {'name': path, 'status': 'pass', 'diffs': [], 'elapsed_ms': 0.0}
+    try:
+        config = {}
+        if os.path.exists(os.path.join(path, CONFIG_FILE)):
+            with open(os.path.join(path, CONFIG_FILE), encoding='utf-8') as f:
+                config = json.load(f)
+        actual = run_commands(read_commands(os.path.join(path, COMMANDS_FILE)), config)
+        expected_path = os.path.join(path, EXPECTED_FILE)
+        if update:
+            with open(expected_path, 'w', encoding='utf-8') as f:
+                json.dump(actual, f, indent=2, ensure_ascii=False)
+            result['status'] = 'updated'
+        elif not os.path.exists(expected_path):
+            result['status'] = 'missing'
+        else:
+            with open(expected_path, encoding='utf-8') as f:
+                expected = json.load(f)
+            # Only the sections the golden file records are compared
+            for section in SECTIONS:
+                if section in expected:
+                    result['diffs'].extend(diff(expected[section], actual[section], section))
+            if result['diffs']:
+                result['status'] = 'fail'
+    except (Exception, SystemExit) as e:
+        result['status'] = 'error'
+        result['diffs'] = [f"{type(e).__name__}: {e}"]
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+def run_corpus(corpus, workers=None, update=False, pattern=None):
+    """Runs every scenario across a process pool; results keep the corpus order"""
+    scenarios = find_scenarios(corpus, pattern)
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(run_scenario, (path, update)) for path in scenarios]
+        for path, future in zip(scenarios, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:  # The worker itself failed, e.g. a broken process pool
+                results.append({'name': path, 'status': 'error', 'diffs': [f"{type(e).__name__}: {e}"], 'elapsed_ms': 0.0})
+    for result in results:
+        result['name'] = os.path.relpath(result['name'], corpus)
+    return {'corpus': corpus, 'elapsed_s': round(time.perf_counter() - started, 3), 'results': results}
+
+def print_report(report, max_diffs=10):
+    counts = {}
+    for result in report['results']:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+        print(f"{result['status'].upper():8} {result['name']} ({result['elapsed_ms']} ms)")
+        for line in result['diffs'][:max_diffs]:
+            print(f"    {line}")
+        if len(result['diffs']) > max_diffs:
+            print(f"    ... {len(result['diffs']) - max_diffs} more")
+    summary = ', '.join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"{len(report['results'])} scenarios in {report['elapsed_s']}s: {summary or 'none found'}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Golden-output regression runner for fdc_simulator.py scenarios")
+    parser.add_argument('corpus', nargs='?', default='scenarios', help="Directory of scenario directories")
+    parser.add_argument('-k', dest='pattern', help="Only run scenarios whose path contains this text")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--update', action='store_true', help="Rewrite expected.json from the current output")
+    parser.add_argument('--json', action='store_true', help="Print the full report as JSON")
+    args = parser.parse_args()
+    report = run_corpus(args.corpus, args.workers, args.update, args.pattern)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    # An empty run fails too: a mistyped corpus path must not pass
+    passed = report['results'] and all(r['status'] in ('pass', 'updated') for r in report['results'])
+    sys.exit(0 if passed else 1)
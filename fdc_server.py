@@ -0,0 +1,181 @@
+# fdc_server.py
+import asyncio
+import contextlib
+import io
+import os
+import sys
+from collections import deque
+
+from fdc_simulator import FDCController, REQUEST_TAG, split_request_tag
+
+DEFAULT_SOCKET = '/tmp/fdc_simulator.sock'
+EVENT_PREFIX = '!'  # Server-pushed lines: "!log <zone> <entry>", "!dropped <count>"
+CLOSE_TIMEOUT = 5  # Seconds a closing session may spend flushing to a client that stopped reading
+
+class ClientSession:
+    """
+    One attached client. Responses and subscribed log events are queued here and written
+    by the session's own task, so a slow reader only ever waits on its own socket.
+    Events beyond max_events are dropped oldest-first and reported with "!dropped N".
+    """
+
+    def __init__(self, writer, max_events=1000, max_responses=64):
+        self.writer = writer
+        self.max_events = max_events
+        self.max_responses = max_responses
+        self.subscribed = False
+        self.events = deque()
+        self.responses = deque()
+        self.dropped = 0
+        self._wakeup = asyncio.Event()
+        self._room = asyncio.Event()
+        self._room.set()
+        self.closed = False
+
+    def push_event(self, line):
+        if len(self.events) >= self.max_events:
+            self.events.popleft()
+            self.dropped += 1
+        self.events.append(line)
+        self._wakeup.set()
+
+    def push_response(self, text):
+        self.responses.append(text)
+        if len(self.responses) >= self.max_responses:
+            self._room.clear()
+        self._wakeup.set()
+
+    async def wait_for_room(self):
+        """Stops reading commands from a client that does not read its responses"""
+        await self._room.wait()
+
+    async def write_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            chunks = []
+            while self.responses:
+                chunks.append(self.responses.popleft())
+            self._room.set()
+            if self.dropped:
+                chunks.append(f"{EVENT_PREFIX}dropped {self.dropped}\n")
+                self.dropped = 0
+            while self.events:
+                chunks.append(self.events.popleft())
+            if chunks:
+                try:
+                    self.writer.write(''.join(chunks).encode())
+                    await self.writer.drain()
+                except (ConnectionError, OSError):
+                    self.closed = True
+            if self.closed:
+                return
+
+    def close(self):
+        """Lets the write loop flush what is queued and finish"""
+        self.closed = True
+        self._room.set()
+        self._wakeup.set()
+
+class SimulatorServer:
+    """
+    Serves one FDCController to several clients over a Unix-domain socket.
+    Clients speak the stdin protocol (optionally "@<id>" tagged); commands run one at a time
+    on the event loop, so they are serialized onto the single controller.
+    "subscribe" / "unsubscribe" switch the fan-out of log entries to that client.
+    """
+
+    def __init__(self, controller, path=DEFAULT_SOCKET, max_events=1000, close_timeout=CLOSE_TIMEOUT):
+        self.controller = controller
+        self.path = path
+        self.max_events = max_events
+        self.close_timeout = close_timeout
+        self.sessions = set()
+        self.server = None
+        controller.log_listeners.append(self._on_log)
+
+    def _on_log(self, zone, entry):
+        line = f"{EVENT_PREFIX}log {zone} {entry}\n"
+        for session in self.sessions:
+            if session.subscribed and not session.closed:
+                session.push_event(line)
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = await asyncio.start_unix_server(self._handle_client, path=self.path)
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def execute(self, cmd):
+        """Runs one command on the controller and returns what it printed"""
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            try:
+                self.controller.process_command(cmd)
+            except SystemExit:
+                raise
+            except Exception as e:
+                print(f"Error: {e}")
+        return out.getvalue()
+
+    async def _handle_client(self, reader, writer):
+        session = ClientSession(writer, self.max_events)
+        self.sessions.add(session)
+        write_task = asyncio.create_task(session.write_loop())
+        try:
+            while not session.closed:
+                await session.wait_for_room()
+                raw = await reader.readline()
+                if not raw:
+                    break
+                tag, cmd = split_request_tag(raw.decode(errors='replace'))
+                action = cmd.strip()
+                closing = False
+                if action == 'subscribe':
+                    session.subscribed = True
+                    output = "Subscribed to log events.\n"
+                elif action == 'unsubscribe':
+                    session.subscribed = False
+                    output = "Unsubscribed from log events.\n"
+                else:
+                    try:
+                        output = self.execute(cmd)
+                    except SystemExit:
+                        # "exit" ends this client's session, not the shared simulator
+                        output, closing = "Session closed.\n", True
+                if tag is not None:
+                    output += f"{REQUEST_TAG}{tag} done\n"
+                session.push_response(output)
+                if closing:
+                    break
+        except asyncio.CancelledError:
+            pass  # Server shutdown; the stream callback would report a cancelled handler as an error
+        finally:
+            self.sessions.discard(session)
+            session.close()
+            try:
+                await asyncio.wait_for(write_task, self.close_timeout)
+            except asyncio.TimeoutError:
+                writer.transport.abort()  # The client stopped reading; drop what it never took
+            except asyncio.CancelledError:
+                writer.transport.abort()  # Shutdown cancelled the write loop mid-flush
+            writer.close()
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOCKET
+    controller = FDCController(model_type='FDC-2KJ', mode='fire', zones=2)
+    controller.alarm_event_log = 'fdc_alarm_events.log'
+    save_file = 'fdc_sim_state.json'
+    if os.path.exists(save_file):
+        controller.load_state(save_file)
+    print(f"FDC Controller Simulation serving on {path}")
+    try:
+        asyncio.run(SimulatorServer(controller, path).serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.save_state(save_file)
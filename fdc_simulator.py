@@ -1,10 +1,41 @@
 # fdc_simulator.py
 import time
 import datetime
+import copy
 import sys
 from collections import defaultdict
 import json
 import os
+import threading
+import functools
+import contextlib
+import io
+import math
+from fdc_eventlog import EventLog, LazyEventLog, CONTROLLER_ZONE, with_repeats
+from fdc_statefile import read_state, write_sections
+from fdc_testsched import format_schedule, schedule
+from fdc_timerwheel import TimerWheel
+from fdc_topology import SpreadQueue, Topology, DUCT_DELAY, SPREAD_TEMP, WALL_DELAY
+
+HISTORY_SIZE = 20
+HISTORY_BASE_REG = 501
+HISTORY_HEAD_REG = 521  # Slot (0-19) the next history entry is written to
+LOG_VIEW_SIZE = 100  # Entries returned by get_logs(zone)
+MAX_REGISTER_ZONES = 99  # Zones mirrored to the per-zone alarm registers 402-500
+DEFAULT_COMM_CLIENT = 'stdin'  # Client name for Modbus/BACnet access without an explicit client
+REQUEST_TAG = '@'  # "@<id> <command>" asks for a "@<id> done" line after the command's output
+COALESCE_WINDOW = 0  # Simulated seconds within which a repeat of an active alarm is counted on its event; 0 is off
+# Commands that snapshot the state under the lock themselves and write their file after releasing it
+UNLOCKED_COMMANDS = frozenset(['save_state', 'export_logs'])
+ALARM_CODES = {'position': 11, 'comm': 12, 'thermal': 20, 'external': 30, 'smoke': 40, 'test_failure': 50}
+
+def _synchronized(method):
+    """Runs the method while holding the controller's state lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class FDCController:
     """
@@ -12,6 +43,15 @@ class FDCController:
     Receives commands via stdin and outputs status via stdout.
     Accelerated version: No sleep delays for instant response.
     Added per-zone logging and save/load state.
+
+    Concurrency: every public method that changes state, and every reader that walks the per-zone
+    dicts or the event log, holds one re-entrant state lock, so a command is applied atomically and
+    front-ends on other threads (protocol servers, the GUI, schedulers) never see it half done.
+    Log and state listeners run under the lock. Status readers take the lock-free path while the
+    cached snapshot is current: the snapshot is only rebuilt, under the lock, after a change, and
+    get_status() hands out a plain-dict copy of it. save_state() and export_logs() copy the state
+    under the lock and write the file after releasing it, also when run as commands. Attributes
+    read directly are only safe from the thread driving the controller.
     """
 
     def __init__(self, model_type='FDC-2KJ', mode='fire', zones=2):
@@ -19,11 +59,11 @@ class FDCController:
         Initialize the controller.
         - model_type: e.g., 'FDC-2KJ' (230V-24V, 2 zones)
         - mode: 'fire' (open normal, close on alarm) or 'smoke' (closed normal, open on alarm)
-        - zones: 2 or 4
+        - zones: 2 or 4 on FDC hardware; larger counts model a building-wide controller
         """
         self.model_type = model_type
         self.mode = mode  # 'fire' or 'smoke'
-        self.zones = zones if zones in [2, 4] else 2
+        self.zones = zones if zones in [2, 4] or zones > 4 else 2
         self.powered = False
         self.damper_positions = {i: 'closed' for i in range(1, self.zones + 1)}  # 'open' or 'closed'
         self.alarm_active = {i: False for i in range(1, self.zones + 1)}  # Per-zone alarm active
@@ -35,15 +75,29 @@ class FDCController:
         self.smoke_detector_type = 'NO'  # 'NO' or 'NC'
         self.operation_time = 90  # seconds, default for position change (but not used for sleep)
         self.test_time = 120  # seconds, default for full test
+        self.zone_operation_times = {}  # zone -> stroke seconds of actuators slower or faster than operation_time
+        self.max_parallel_actuators = 0  # Dampers a full test may move at once (power budget); 0 = all
+        self.last_test_plan = None  # fdc_testsched plan of the most recent full test
         self.comm_timeout = 120  # seconds, for Modbus/BACnet
         self.comm_timeout_enabled = False
+        # Communication watchdog: per-client deadlines on a timer wheel in simulated seconds
+        self.sim_seconds = 0  # Monotonic simulated clock, unaffected by RTC writes
+        self.comm_clients = {}  # client -> sim_seconds of last Modbus/BACnet access
+        self.comm_wheel = TimerWheel()
+        self.comm_lost = set()  # Clients whose timeout lapsed since their last access
+        self.comm_alarm = False
         self.auto_test_enabled = False
         self.auto_test_interval_hours = 24  # default
         self.auto_test_hour = 0
         self.auto_test_minute = 0
         self.next_auto_test = None
         self.rtc = datetime.datetime(2025, 9, 10, 11, 20)  # Updated to 11:20 AM +04
-        self.alarm_history = []  # List of alarm codes
+        # Alarm history ring mirrored to registers 501-520, head pointer in 521
+        self._history_ring = [0] * HISTORY_SIZE
+        self._history_head = 0  # Next slot to write
+        self._history_count = 0
+        self._history_repeats = [0] * HISTORY_SIZE  # Coalesced repeats of the alarm in each slot
+        self.alarm_event_log = None  # Path of the unbounded on-disk alarm event log
         self.dip_sw1 = 0  # Modbus/BACnet Slave ID (0-127)
         self.dip_sw4 = {'DIP5': 0, 'DIP6': 1, 'DIP7': 0}  # 0=Modbus,1=BACnet; DIP6:1=ALARM,0=FAN; DIP7:0=Smoke,1=Fire
         self.relay_mode = 'ALARM' if self.dip_sw4['DIP6'] else 'FAN'
@@ -54,8 +108,25 @@ class FDCController:
         self.led_status = 'OFF'  # 'ON', 'FLASH', 'OFF'
         self.led_fault = 'OFF'
         self.temp_sensor = {i: 20.0 for i in range(1, self.zones + 1)}  # Per-zone temperature
-        # Per-zone logs
-        self.logs = {i: [] for i in range(1, self.zones + 1)}
+        # Named zone groups (fire compartments, floors) and the reverse membership index
+        self.zone_groups = {}  # name -> sorted list of zones
+        self._zone_group_index = defaultdict(set)  # zone -> names of the groups containing it
+        # Building topology (walls, shared ducts) and the frontier of pending smoke/heat spread
+        self.topology = None
+        self.spread = SpreadQueue()
+        # Logs of all zones; controller-wide events are stored once under CONTROLLER_ZONE
+        self.events = EventLog()
+        # Alarm-storm coalescing: repeats of a still-active alarm within the window only bump a counter
+        self.coalesce_window = COALESCE_WINDOW  # 0 disables coalescing
+        self._alarm_events = {}  # (zone, alarm_type) -> [sim_seconds of the last trigger, seq of its event, history slot]
+        self.log_listeners = []  # Callables (zone, entry) notified of every new log entry
+        self.version = 0  # Bumped on every state change
+        self.state_listeners = []  # Callables (controller) notified after each command that changed state
+        self._notified_version = 0
+        self._status_cache = None  # (version, status dict (never mutated), JSON text, JSON bytes)
+        self._lock = threading.RLock()  # State lock, see the class docstring
+        self.recorder = None  # fdc_recorder.Recorder sampling trend signals, if attached
+        self.timetravel = None  # fdc_timetravel.TimeTravel journaling commands for seek, if attached
 
     def _init_modbus_registers(self):
         """Initialize Modbus holding registers based on manual section 5."""
@@ -84,11 +155,12 @@ class FDCController:
         regs[314] = int(self.auto_test_enabled)
         # Alarm registers (page 15)
         regs[401] = 0  # Active alarms bitmask
-        for i in range(1, self.zones + 1):
+        for i in range(1, min(self.zones, MAX_REGISTER_ZONES) + 1):
             regs[401 + i] = 0  # Per zone alarms
-        # History (501-520)
-        for i in range(501, 521):
+        # History (501-520) ring and head pointer
+        for i in range(HISTORY_BASE_REG, HISTORY_BASE_REG + HISTORY_SIZE):
             regs[i] = 0
+        regs[HISTORY_HEAD_REG] = 0
         return regs
 
     def _init_bacnet_objects(self):
@@ -122,33 +194,107 @@ class FDCController:
         types = {'FDC-2KJ': 1, 'FDC-2JJ': 2, 'FDC-2KK': 3, 'FDC-4KJ': 4, 'FDC-4JJ': 5, 'FDC-4KK': 6}
         return types.get(self.model_type, 1)
 
-    def _add_log(self, zone, message):
-        if zone not in self.logs:
-            self.logs[zone] = []
-        timestamp = self.rtc.strftime("%Y-%m-%d %H:%M:%S")
-        entry = f"[{timestamp}] {message}"
-        self.logs[zone].append(entry)
-        if len(self.logs[zone]) > 100:
-            self.logs[zone].pop(0)
+    def _mark_dirty(self):
+        self.version += 1
+
+    def _add_log(self, zone, message, event_type='info'):
+        """Logs to one zone, or once for all zones with zone=CONTROLLER_ZONE"""
+        seq = self.events.append(self.rtc, zone, event_type, message)
+        self._mark_dirty()
+        entry = self._format_entry(self.rtc, message)
         print(entry)  # for console
+        for listener in self.log_listeners:
+            listener(zone, entry)
+        return seq
+
+    @staticmethod
+    def _format_entry(timestamp, message):
+        return f"[{timestamp.strftime('%Y-%m-%d %H:%M:%S')}] {message}"
+
+    @_synchronized
+    def clone(self):
+        """
+        In-memory fork of the controller for what-if and Monte Carlo runs.
+        Scalar config is immutable and shared as is; per-zone state, topology, registers
+        and the alarm history ring are copied. The event log is forked: entries logged so far are
+        shared and only new ones are stored per clone. The clone has no listeners and
+        writes no on-disk alarm log.
+        """
+        other = copy.copy(self)
+        other._lock = threading.RLock()
+        other.damper_positions = dict(self.damper_positions)
+        other.alarm_active = dict(self.alarm_active)
+        other.smoke_alarm = dict(self.smoke_alarm)
+        other.thermal_alarm = dict(self.thermal_alarm)
+        other.temp_sensor = dict(self.temp_sensor)
+        other.zone_operation_times = dict(self.zone_operation_times)
+        other.zone_groups = {name: list(zones) for name, zones in self.zone_groups.items()}
+        other._zone_group_index = defaultdict(set, {zone: set(names) for zone, names in self._zone_group_index.items()})
+        other.topology = self.topology.copy() if self.topology else None
+        other.spread = self.spread.copy()
+        other.dip_sw4 = dict(self.dip_sw4)
+        other.modbus_registers = self.modbus_registers.copy()
+        other.bacnet_objects = {k: v.copy() for k, v in self.bacnet_objects.items()}
+        other._history_ring = list(self._history_ring)
+        other._history_repeats = list(self._history_repeats)
+        other.events = self.events.fork()
+        other._alarm_events = {key: list(last) for key, last in self._alarm_events.items()}
+        other.comm_clients = dict(self.comm_clients)
+        other.comm_wheel = self.comm_wheel.copy()
+        other.comm_lost = set(self.comm_lost)
+        other.log_listeners = []
+        other.state_listeners = []
+        other.alarm_event_log = None
+        other.recorder = None
+        other.timetravel = None
+        return other
 
+    @_synchronized
     def get_logs(self, zone):
-        """Returns list of logs for the specified zone"""
-        return self.logs.get(zone, [])
+        """Returns list of logs for the specified zone, merged with the controller-wide events"""
+        if not 1 <= zone <= self.zones and not self.events.has_zone(zone):
+            return []
+        return [self._format_entry(at, with_repeats(message, self.events.repeats(seq)))
+                for seq, (at, _, _, message) in self.events.tail([zone, CONTROLLER_ZONE], LOG_VIEW_SIZE)]
+
+    @_synchronized
+    def query_logs(self, zones=None, since=None, until=None, types=None, limit=None):
+        """
+        Structured log entries filtered by zones, RTC range [since, until] and event types, oldest first.
+        Served from the event log's time/type/zone indexes; since/until are datetimes or ISO strings.
+        Controller-wide events (zone 0) match any zone filter. Coalesced alarms carry a "repeats" count.
+        """
+        if zones:
+            zones = list(zones) + [CONTROLLER_ZONE]
+        if isinstance(since, str):
+            since = datetime.datetime.fromisoformat(since)
+        if isinstance(until, str):
+            until = datetime.datetime.fromisoformat(until)
+        entries = []
+        for seq, (at, zone, event_type, message) in self.events.query(zones, since, until, types, limit):
+            entry = {'time': at.strftime("%Y-%m-%d %H:%M:%S"), 'zone': zone, 'type': event_type, 'message': message}
+            repeats = self.events.repeats(seq)
+            if repeats:
+                entry['repeats'] = repeats
+            entries.append(entry)
+        return entries
 
+    @_synchronized
     def power_on(self):
         self.powered = True
         self.rtc = datetime.datetime(2025, 9, 10, 11, 20)
+        # The power-on test runs in simulated time, so the RTC reads 11:20 plus the test's makespan
+        # (270 s with the default 90 s strokes) once it is done and "Controller powered on" is logged
         if not any(self.alarm_active.values()):
             self.perform_full_test()
         self._set_working_position()
         self._update_leds()
         self._update_relay()
         self._update_analog_out()
-        for z in range(1, self.zones + 1):
-            self._add_log(z, "Controller powered on")
+        self._add_log(CONTROLLER_ZONE, "Controller powered on", 'power')
         print("Controller powered on.")
 
+    @_synchronized
     def power_off(self):
         self.powered = False
         for i in range(1, self.zones + 1):
@@ -157,31 +303,43 @@ class FDCController:
         for i in range(1, self.zones + 1):
             self.smoke_alarm[i] = False
             self.thermal_alarm[i] = False
+        self.spread.clear()
         self._set_working_position()  # Reset to default positions
         self._update_leds()
         self._update_relay()
         self._update_analog_out()
-        for z in range(1, self.zones + 1):
-            self._add_log(z, "Controller powered off")
+        self._add_log(CONTROLLER_ZONE, "Controller powered off", 'power')
         print("Controller powered off.")
 
-    def _set_working_position(self):
+    def _working_position(self):
         pos = 'open' if self.mode == 'fire' else 'closed'
         if self.invert_position:
             pos = 'closed' if pos == 'open' else 'open'
+        return pos
+
+    def _set_working_position(self):
+        pos = self._working_position()
         for i in range(1, self.zones + 1):
             self._change_damper_position(i, pos)
 
-    def _change_damper_position(self, zone, position, simulate_time=False):
+    def _change_damper_position(self, zone, position, simulate_time=False, update_outputs=True):
         if simulate_time:
             time.sleep(self.operation_time / 100)
         self.damper_positions[zone] = position
-        self._add_log(zone, f"Damper moved to {position.upper()}")
-        self._update_analog_out()
+        self._add_log(zone, f"Damper moved to {position.upper()}", 'damper')
+        if update_outputs:
+            self._update_analog_out()
 
+    @_synchronized
     def trigger_alarm(self, alarm_type, zone=None):
         if zone is None:
             zone = 1  # Default to zone 1 if not specified
+        alarm_pos = self._alarm_position()
+        repeats = self._coalesce(alarm_type, zone, alarm_pos)
+        if repeats:
+            print(f"{alarm_type.capitalize()} alarm repeated in zone {zone} ({repeats} repeats).")
+            return
+        duct_open = self.damper_positions.get(zone) == 'open'
         self.alarm_active[zone] = True
         if alarm_type == 'external':
             self.external_alarm = True
@@ -189,24 +347,53 @@ class FDCController:
             self.smoke_alarm[zone] = True
         elif alarm_type == 'thermal':
             self.thermal_alarm[zone] = True
-        self._add_to_history(alarm_type)
-        alarm_pos = 'closed' if self.mode == 'fire' else 'open'
-        if self.invert_position:
-            alarm_pos = 'open' if alarm_pos == 'closed' else 'closed'
+        slot = self._add_to_history(alarm_type, zone)
         self._change_damper_position(zone, alarm_pos)
         self._update_alarms_register()
         self._update_leds()
         self._update_relay()
         self._update_analog_out()
-        self._add_log(zone, f"{alarm_type.capitalize()} alarm triggered")
+        seq = self._add_log(zone, f"{alarm_type.capitalize()} alarm triggered", f"{alarm_type}_alarm")
+        self._alarm_events[(zone, alarm_type)] = [self.sim_seconds, seq, slot]
         print(f"{alarm_type.capitalize()} alarm triggered in zone {zone}.")
+        self._schedule_spread(zone, alarm_type, duct_open)
+
+    def _alarm_position(self):
+        alarm_pos = 'closed' if self.mode == 'fire' else 'open'
+        if self.invert_position:
+            alarm_pos = 'open' if alarm_pos == 'closed' else 'closed'
+        return alarm_pos
 
+    def _coalesce(self, alarm_type, zone, alarm_pos):
+        """
+        Counts a repeat of an alarm that is still active, with the damper already in its alarm
+        position, on the event it logged, its alarm history slot and the on-disk alarm log, if the
+        last trigger was within coalesce_window simulated seconds. Returns the new repeat count,
+        or 0 when the trigger must run in full.
+        """
+        last = self._alarm_events.get((zone, alarm_type))
+        if not last or not self.coalesce_window or self.sim_seconds - last[0] > self.coalesce_window:
+            return 0
+        still_set = {'smoke': self.smoke_alarm.get(zone), 'thermal': self.thermal_alarm.get(zone),
+                     'external': self.external_alarm}.get(alarm_type, True)
+        if not (still_set and self.alarm_active.get(zone) and self.damper_positions.get(zone) == alarm_pos):
+            return 0
+        last[0] = self.sim_seconds  # The window slides, so a continuous storm stays on one event
+        self.events.add_repeat(last[1])
+        repeats = self.events.repeats(last[1])
+        if last[2] is not None:
+            self._history_repeats[last[2]] = repeats
+            self._log_alarm_event(self._history_ring[last[2]], alarm_type, zone, repeats)
+        self._mark_dirty()
+        return repeats
+
+    @_synchronized
     def reset_alarms(self, zone=None):
         if zone:
             self.alarm_active[zone] = False
             self.smoke_alarm[zone] = False
             self.thermal_alarm[zone] = False
-            self._add_log(zone, "Alarms reset")
+            self._add_log(zone, "Alarms reset", 'reset')
         else:
             for i in range(1, self.zones + 1):
                 self.alarm_active[i] = False
@@ -214,7 +401,8 @@ class FDCController:
             for i in range(1, self.zones + 1):
                 self.smoke_alarm[i] = False
                 self.thermal_alarm[i] = False
-            self._add_log(1, "All alarms reset")  # Log to zone 1 or all if needed
+            self.spread.clear()
+            self._add_log(1, "All alarms reset", 'reset')  # Log to zone 1 or all if needed
         self._set_working_position()
         self._update_alarms_register()
         self._update_leds()
@@ -222,52 +410,246 @@ class FDCController:
         self._update_analog_out()
         print("Alarms reset.")
 
+    @_synchronized
+    def define_group(self, name, zones):
+        """Creates or replaces a named zone group"""
+        self.delete_group(name)
+        zones = sorted(set(zones))
+        self.zone_groups[name] = zones
+        for zone in zones:
+            self._zone_group_index[zone].add(name)
+        self._add_log(CONTROLLER_ZONE, f"Zone group {name} defined: {zones}", 'config')
+
+    @_synchronized
+    def delete_group(self, name):
+        zones = self.zone_groups.pop(name, None)
+        if zones is None:
+            return False
+        for zone in zones:
+            names = self._zone_group_index[zone]
+            names.discard(name)
+            if not names:
+                del self._zone_group_index[zone]
+        self._add_log(CONTROLLER_ZONE, f"Zone group {name} deleted", 'config')
+        return True
+
+    def groups_of(self, zone):
+        """Names of the groups a zone belongs to"""
+        return sorted(self._zone_group_index.get(zone, ()))
+
+    def resolve_zones(self, spec):
+        """
+        Zones named by spec: a zone number, a range "1-8", a list "1,3,5" (which may mix ranges
+        and groups), "@group" or "all". Zones outside 1..zones are dropped.
+        """
+        zones = set()
+        for part in str(spec).split(','):
+            part = part.strip()
+            if part == 'all':
+                zones.update(range(1, self.zones + 1))
+            elif part.startswith('@'):
+                zones.update(self.zone_groups.get(part[1:], ()))
+            elif '-' in part:
+                first, _, last = part.partition('-')
+                zones.update(range(int(first), int(last) + 1))
+            elif part:
+                zones.add(int(part))
+        return sorted(z for z in zones if 1 <= z <= self.zones)
+
+    def _update_outputs(self):
+        self._update_alarms_register()
+        self._update_leds()
+        self._update_relay()
+        self._update_analog_out()
+
+    @_synchronized
+    def trigger_alarms(self, alarm_type, zones):
+        """Triggers an alarm in every given zone, deriving registers, LEDs, relay and analog output once"""
+        alarm_pos = self._alarm_position()
+        flags = self.smoke_alarm if alarm_type == 'smoke' else self.thermal_alarm if alarm_type == 'thermal' else None
+        triggered = 0
+        for zone in zones:
+            if self._coalesce(alarm_type, zone, alarm_pos):
+                continue
+            triggered += 1
+            duct_open = self.damper_positions.get(zone) == 'open'
+            self.alarm_active[zone] = True
+            if flags is not None:
+                flags[zone] = True
+            elif alarm_type == 'external':
+                self.external_alarm = True
+            slot = self._add_to_history(alarm_type, zone)
+            self._change_damper_position(zone, alarm_pos, update_outputs=False)
+            seq = self._add_log(zone, f"{alarm_type.capitalize()} alarm triggered", f"{alarm_type}_alarm")
+            self._alarm_events[(zone, alarm_type)] = [self.sim_seconds, seq, slot]
+            self._schedule_spread(zone, alarm_type, duct_open)
+        if triggered:
+            self._update_outputs()
+            print(f"{alarm_type.capitalize()} alarm triggered in zones {zones}.")
+        else:
+            print(f"{alarm_type.capitalize()} alarm repeated in zones {zones}.")
+
+    @_synchronized
+    def reset_alarms_in(self, zones):
+        """Resets the alarms of the given zones, then restores the working position and outputs once"""
+        for zone in zones:
+            self.alarm_active[zone] = False
+            self.smoke_alarm[zone] = False
+            self.thermal_alarm[zone] = False
+            self._add_log(zone, "Alarms reset", 'reset')
+        for i in range(1, self.zones + 1):
+            self._change_damper_position(i, self._working_position(), update_outputs=False)
+        self._update_outputs()
+        print(f"Alarms reset in zones {zones}.")
+
+    @_synchronized
+    def set_temperatures(self, zones, temp):
+        """Sets the temperature of the given zones; those above 72°C raise one bulk thermal alarm"""
+        for zone in zones:
+            self.temp_sensor[zone] = temp
+            self._add_log(zone, f"Temperature set to {temp}°C", 'temperature')
+        print(f"Temperature set to {temp}°C in zones {zones}")
+        if temp > 72:
+            hot = [zone for zone in zones if not self.alarm_active[zone]]
+            if hot:
+                self.trigger_alarms('thermal', hot)
+
+    def _schedule_spread(self, zone, alarm_type, duct_open):
+        """
+        Puts the zone's neighbors on the spread frontier: heat from a thermal alarm and smoke
+        from a smoke alarm cross walls; smoke also enters the zone's ducts if its damper was
+        open when the alarm hit (it leaks in while the damper closes).
+        """
+        if self.topology is None or alarm_type not in ('smoke', 'thermal'):
+            return
+        kind = 'heat' if alarm_type == 'thermal' else 'smoke'
+        for neighbor, delay in self.topology.wall_neighbors(zone):
+            if not self.alarm_active.get(neighbor, True):
+                self.spread.push(self.sim_seconds + delay, neighbor, kind, zone)
+        if kind == 'smoke' and duct_open:
+            for neighbor, delay, duct in self.topology.duct_neighbors(zone):
+                if not self.alarm_active.get(neighbor, True):
+                    self.spread.push(self.sim_seconds + delay, neighbor, kind, zone, duct)
+
+    def _propagate(self, until):
+        """
+        Applies spread events due up to sim_seconds == until in time order, with the clocks set
+        to each event's time. Zones already in alarm, or whose source was reset, are skipped;
+        smoke arriving through a duct is stopped by the receiving zone's closed damper.
+        """
+        base_seconds, base_rtc = self.sim_seconds, self.rtc
+        while self.spread and self.spread.next_due() <= until:
+            due = self.spread.next_due()
+            self.sim_seconds = due
+            self.rtc = base_rtc + datetime.timedelta(seconds=due - base_seconds)
+            reached = {'heat': [], 'smoke': []}
+            for _, zone, kind, source, duct in self.spread.pop_due(due):
+                if self.alarm_active.get(zone, True) or not self.alarm_active.get(source) or zone in reached[kind]:
+                    continue
+                if duct and self.damper_positions[zone] == 'closed':
+                    self._add_log(zone, f"Smoke from zone {source} stopped by closed damper (duct {duct})", 'spread')
+                    continue
+                via = f"duct {duct}" if duct else "wall"
+                self._add_log(zone, f"{kind.capitalize()} spread from zone {source} through {via}", 'spread')
+                reached[kind].append(zone)
+            for zone in reached['heat']:
+                self.temp_sensor[zone] = max(self.temp_sensor[zone], SPREAD_TEMP)
+            if reached['heat']:
+                self.trigger_alarms('thermal', reached['heat'])
+            smoke = [zone for zone in reached['smoke'] if not self.alarm_active[zone]]
+            if smoke:
+                self.trigger_alarms('smoke', smoke)
+        self.sim_seconds, self.rtc = base_seconds, base_rtc
+
+    @_synchronized
+    def set_topology(self, topology):
+        self.topology = topology
+        self.spread.clear()
+        self._add_log(CONTROLLER_ZONE, f"Topology set: {len(topology.walls)} zones with walls, {len(topology.ducts)} ducts", 'config')
+
+    def predict_spread(self, zone, alarm_type='smoke', horizon=3600):
+        """
+        What-if on a clone: triggers the alarm, lets horizon seconds pass and reports, in seconds
+        after the trigger, every alarm and damper move the spread would cause.
+        """
+        with self._lock:
+            sim = self.clone()
+        sim.coalesce_window = 0  # The prediction always starts a fresh spread from zone
+        first_seq = sim.events.next_seq
+        start = sim.rtc
+        with contextlib.redirect_stdout(io.StringIO()):
+            sim.trigger_alarm(alarm_type, zone)
+            sim.simulate_time_pass(horizon)
+        alarms, dampers = [], []
+        for seq, (at, event_zone, event_type, message) in sim.events.query(since=start, types=['damper', 'smoke_alarm', 'thermal_alarm']):
+            if seq < first_seq:
+                continue
+            seconds = (at - start).total_seconds()
+            if event_type == 'damper':
+                dampers.append({'seconds': seconds, 'zone': event_zone, 'position': message.rsplit(' ', 1)[-1].lower()})
+            else:
+                alarms.append({'seconds': seconds, 'zone': event_zone, 'type': event_type[:-len('_alarm')]})
+        return {'alarms': alarms, 'dampers': dampers}
+
+    @_synchronized
     def perform_full_test(self):
         if any(self.alarm_active.values()):
             print("Can't perform test with active alarms.")
             return
         self.test_mode = True
         self._update_leds()
-        for i in range(1, self.zones + 1):
-            self._change_damper_position(i, 'closed')
-            self._add_log(i, "Full test started: Damper closed")
-        for i in range(1, self.zones + 1):
-            self._change_damper_position(i, 'open')
-            self._add_log(i, "Full test: Damper opened")
-        for i in range(1, self.zones + 1):
-            self._change_damper_position(i, 'closed')
-            self._add_log(i, "Full test: Damper closed again")
-        elapsed = 0  # Instant
-        if elapsed > self.test_time:
+        # Staggered plan: at most max_parallel_actuators dampers move at once. The clocks move on
+        # to each stroke's completion before it is logged, so the test takes plan['makespan'].
+        plan = self.last_test_plan = schedule(self._stroke_times(), self.max_parallel_actuators)
+        strokes = sorted((end, zone, position, message) for zone, timing in plan['zones'].items()
+                         for position, message, _, end in timing['strokes'])
+        elapsed = 0
+        for end, zone, position, message in strokes:
+            self._advance_clocks(end - elapsed)
+            elapsed = end
+            self._change_damper_position(zone, position, update_outputs=False)
+            self._add_log(zone, message, 'test')
+        self._update_analog_out()
+        # test_time bounds one pass: every damper must complete a stroke within it
+        if plan['pass_time'] > self.test_time:
             self.trigger_alarm('test_failure')
             print("Test failed: Time exceeded.")
         else:
             print("Test passed.")
             for i in range(1, self.zones + 1):
-                self._add_log(i, "Full test passed")
+                self._add_log(i, "Full test passed", 'test')
         self.test_mode = False
         self._set_working_position()
         self._update_leds()
 
+    def _stroke_times(self):
+        return {i: self.zone_operation_times.get(i, self.operation_time) for i in range(1, self.zones + 1)}
+
+    @_synchronized
+    def plan_full_test(self):
+        """The plan perform_full_test would follow now, without moving anything"""
+        return schedule(self._stroke_times(), self.max_parallel_actuators)
+
+    @_synchronized
     def reset_smoke_detector(self):
         for i in range(1, self.zones + 1):
             self.smoke_alarm[i] = False
-            self._add_log(i, "Smoke detectors reset")
+        self._add_log(CONTROLLER_ZONE, "Smoke detectors reset", 'reset')
         if not any(self.smoke_alarm.values()) and not any(self.thermal_alarm.values()) and not self.external_alarm:
             self.reset_alarms()
         print("Smoke detectors reset.")
 
+    @_synchronized
     def set_invert_position(self, invert):
         self.invert_position = bool(invert)
         self._set_working_position()
-        for i in range(1, self.zones + 1):
-            self._add_log(i, f"Invert position set to {self.invert_position}")
+        self._add_log(CONTROLLER_ZONE, f"Invert position set to {self.invert_position}", 'config')
         print(f"Invert position set to {self.invert_position}")
 
+    @_synchronized
     def set_smoke_detector_type(self, typ):
         self.smoke_detector_type = typ.upper() if typ.upper() in ['NO', 'NC'] else 'NO'
-        for i in range(1, self.zones + 1):
-            self._add_log(i, f"Smoke detector type set to {self.smoke_detector_type}")
+        self._add_log(CONTROLLER_ZONE, f"Smoke detector type set to {self.smoke_detector_type}", 'config')
         print(f"Smoke detector type set to {self.smoke_detector_type}")
 
     def _update_analog_out(self):
@@ -307,26 +689,131 @@ class FDCController:
             bitmask |= 1 << 3
         if self.test_mode and False:  # Placeholder
             bitmask |= 1 << 4
-        if self.comm_timeout_enabled and False:  # Placeholder
+        if self.comm_timeout_enabled and self.comm_alarm:
             bitmask |= 1 << 5
         self.modbus_registers[401] = bitmask
-        for i in range(1, self.zones + 1):
+        for i in range(1, min(self.zones, MAX_REGISTER_ZONES) + 1):
             self.modbus_registers[401 + i] = int(self.smoke_alarm[i] or self.thermal_alarm[i])
 
-    def _add_to_history(self, alarm_type):
-        codes = {'position': 11, 'comm': 12, 'thermal': 20, 'external': 30, 'smoke': 40, 'test_failure': 50}
-        code = codes.get(alarm_type, 0)
+    @property
+    def alarm_history(self):
+        """Alarm codes in the ring, oldest first"""
+        start = (self._history_head - self._history_count) % HISTORY_SIZE
+        return [self._history_ring[(start + i) % HISTORY_SIZE] for i in range(self._history_count)]
+
+    @property
+    def alarm_history_repeats(self):
+        """Coalesced repeats of each alarm in alarm_history"""
+        start = (self._history_head - self._history_count) % HISTORY_SIZE
+        return [self._history_repeats[(start + i) % HISTORY_SIZE] for i in range(self._history_count)]
+
+    @alarm_history.setter
+    @_synchronized
+    def alarm_history(self, codes):
+        self._set_history(codes)
+
+    def _set_history(self, codes, head=None, repeats=None):
+        """Rebuilds the ring from codes (oldest first) so that the next write goes to slot head"""
+        codes = list(codes)[-HISTORY_SIZE:]
+        repeats = ([0] * len(codes) + list(repeats or []))[len(repeats or []):]  # Aligned with codes
+        if head is None:
+            head = len(codes) % HISTORY_SIZE
+        start = (head - len(codes)) % HISTORY_SIZE
+        self._history_ring = [0] * HISTORY_SIZE
+        self._history_repeats = [0] * HISTORY_SIZE
+        for i, (c, r) in enumerate(zip(codes, repeats)):
+            self._history_ring[(start + i) % HISTORY_SIZE] = c
+            self._history_repeats[(start + i) % HISTORY_SIZE] = r
+        for last in self._alarm_events.values():
+            last[2] = None  # The slots no longer hold the alarms being coalesced
+        self._history_count = len(codes)
+        self._history_head = head
+        for i, c in enumerate(self._history_ring):
+            self.modbus_registers[HISTORY_BASE_REG + i] = c
+        self.modbus_registers[HISTORY_HEAD_REG] = self._history_head
+        self._mark_dirty()
+
+    def _add_to_history(self, alarm_type, zone=None):
+        """Writes the alarm's code to the next ring slot and returns the slot, or None for alarms without a code"""
+        code = ALARM_CODES.get(alarm_type, 0)
         if code:
-            self.alarm_history.append(code)
-            if len(self.alarm_history) > 20:
-                self.alarm_history.pop(0)
-            for i, c in enumerate(self.alarm_history):
-                self.modbus_registers[501 + i] = c
+            slot = self._history_head
+            self._history_ring[slot] = code
+            self._history_repeats[slot] = 0
+            for last in self._alarm_events.values():
+                if last[2] == slot:
+                    last[2] = None  # That alarm's entry was just overwritten
+            self.modbus_registers[HISTORY_BASE_REG + slot] = code
+            self._history_head = (slot + 1) % HISTORY_SIZE
+            self.modbus_registers[HISTORY_HEAD_REG] = self._history_head
+            if self._history_count < HISTORY_SIZE:
+                self._history_count += 1
+            self._mark_dirty()
+            self._log_alarm_event(code, alarm_type, zone)
+            return slot
+        return None
+
+    def _log_alarm_event(self, code, alarm_type, zone, repeats=0):
+        """
+        Appends one line per alarm to the on-disk event log (unbounded, unlike the ring); a coalesced
+        repeat appends another line carrying the alarm's repeat count so far
+        """
+        if not self.alarm_event_log:
+            return
+        # Opened per line: alarms are rare, and no handle is left open when the simulator exits
+        with open(self.alarm_event_log, 'a') as f:
+            f.write(f"{self.rtc.isoformat()},{zone if zone is not None else ''},{code},{alarm_type},{repeats}\n")
+
+    @_synchronized
+    def note_comm_access(self, client=DEFAULT_COMM_CLIENT):
+        """Records a Modbus/BACnet access and re-arms the client's communication watchdog"""
+        self.comm_clients[client] = self.sim_seconds
+        if self.comm_timeout_enabled:
+            self.comm_wheel.schedule(client, self.sim_seconds + self.comm_timeout)
+        if client in self.comm_lost:
+            self.comm_lost.discard(client)
+            self._add_log(CONTROLLER_ZONE, f"Communication restored: client {client}", 'comm')
+            if not self.comm_lost:
+                self._set_comm_alarm(False)
+
+    def _rearm_comm_watchdogs(self):
+        """Re-arms every client from its last access after the timeout was enabled or changed"""
+        self.comm_wheel.clear()
+        if not self.comm_timeout_enabled:
+            self.comm_lost.clear()
+            self._set_comm_alarm(False)
+            return
+        for client, last in self.comm_clients.items():
+            if client not in self.comm_lost:
+                self.comm_wheel.schedule(client, last + self.comm_timeout)
+
+    def _check_comm_watchdogs(self):
+        for client, _ in self.comm_wheel.advance(self.sim_seconds):
+            self.comm_lost.add(client)
+            self._add_log(CONTROLLER_ZONE, f"Communication timeout: client {client}", 'comm_alarm')
+            print(f"Communication timeout for client {client}.")
+            if not self.comm_alarm:
+                self._add_to_history('comm')
+                self._set_comm_alarm(True)
+
+    def _set_comm_alarm(self, active):
+        if self.comm_alarm != active:
+            self.comm_alarm = active
+            self._update_alarms_register()
+            self._mark_dirty()
 
-    def modbus_read(self, reg):
+    @_synchronized
+    def modbus_read(self, reg, client=DEFAULT_COMM_CLIENT):
+        self.note_comm_access(client)
         return self.modbus_registers.get(reg, 0)
 
-    def modbus_write(self, reg, value):
+    @_synchronized
+    def bacnet_read(self, obj_type, instance, client=DEFAULT_COMM_CLIENT):
+        self.note_comm_access(client)
+        return self.bacnet_objects.get(obj_type, {}).get(instance, 0)
+
+    @_synchronized
+    def modbus_write(self, reg, value, client=DEFAULT_COMM_CLIENT):
         if reg == 101 and value == 1:
             self.perform_full_test()
         elif reg == 102 and value == 1:
@@ -337,13 +824,14 @@ class FDCController:
             self.set_smoke_detector_type('NC' if value else 'NO')
         elif reg == 105 and value == 1:
             self.alarm_history = []
-            for i in range(1, self.zones + 1):
-                self._add_log(i, "Alarm history cleared")
+            self._add_log(CONTROLLER_ZONE, "Alarm history cleared", 'history')
             print("Alarm history cleared.")
         elif reg == 302:
             self.comm_timeout_enabled = bool(value)
+            self._rearm_comm_watchdogs()
         elif reg == 303:
             self.comm_timeout = max(60, min(360, value))
+            self._rearm_comm_watchdogs()
         elif reg == 304:
             self.operation_time = max(60, min(360, value))
         elif reg == 305:
@@ -354,8 +842,7 @@ class FDCController:
             elif reg == 308: self.rtc = self.rtc.replace(day=value)
             elif reg == 309: self.rtc = self.rtc.replace(hour=value)
             elif reg == 310: self.rtc = self.rtc.replace(minute=value)
-            for i in range(1, self.zones + 1):
-                self._add_log(i, "RTC updated")
+            self._add_log(CONTROLLER_ZONE, "RTC updated", 'rtc')
             print("RTC updated.")
         elif reg == 311:
             self.auto_test_interval_hours = max(1, min(4464, value))
@@ -367,10 +854,11 @@ class FDCController:
             self.auto_test_enabled = bool(value)
             if self.auto_test_enabled:
                 self._schedule_next_auto_test()
-            for i in range(1, self.zones + 1):
-                self._add_log(i, f"Auto test enabled: {self.auto_test_enabled}")
+            self._add_log(CONTROLLER_ZONE, f"Auto test enabled: {self.auto_test_enabled}", 'config')
             print(f"Auto test enabled: {self.auto_test_enabled}")
         self.modbus_registers[reg] = value
+        self.note_comm_access(client)
+        self._mark_dirty()
 
     def _schedule_next_auto_test(self):
         interval = datetime.timedelta(hours=self.auto_test_interval_hours)
@@ -378,37 +866,61 @@ class FDCController:
         while next_time <= self.rtc:
             next_time += interval
         self.next_auto_test = next_time
+        self._mark_dirty()
         print(f"Next auto test scheduled at {self.next_auto_test}")
 
-    def simulate_time_pass(self, seconds):
+    def _advance_clocks(self, seconds):
+        """Moves the RTC and the simulated clock on, applying the spread and comm timeouts due meanwhile"""
+        if seconds <= 0:
+            return
+        if self.spread:
+            self._propagate(self.sim_seconds + seconds)
         self.rtc += datetime.timedelta(seconds=seconds)
-        for i in range(1, self.zones + 1):
-            self._add_log(i, f"Time advanced by {seconds} seconds. Current RTC: {self.rtc}")
-        print(f"Time advanced by {seconds} seconds. Current RTC: {self.rtc}")
-        if self.auto_test_enabled and self.next_auto_test and self.rtc >= self.next_auto_test:
+        self.sim_seconds += seconds
+        self._check_comm_watchdogs()
+
+    @_synchronized
+    def simulate_time_pass(self, seconds):
+        """
+        Lets seconds pass; a negative count only turns the RTC back. An auto test falling due starts
+        at its scheduled time and takes up part of the span, so the clocks only end up past the
+        span when the test is still running at its end.
+        """
+        end = self.rtc + datetime.timedelta(seconds=seconds)
+        if seconds < 0:
+            self.rtc = end  # sim_seconds is monotonic
+        if self.auto_test_enabled and self.next_auto_test and self.next_auto_test <= end:
+            self._advance_clocks(math.ceil((self.next_auto_test - self.rtc).total_seconds()))
             print("Auto test triggered by time pass.")
             self.perform_full_test()
             self._schedule_next_auto_test()
+        self._advance_clocks(math.ceil((end - self.rtc).total_seconds()))
+        self._add_log(CONTROLLER_ZONE, f"Time advanced by {seconds} seconds. Current RTC: {self.rtc}", 'time')
+        print(f"Time advanced by {seconds} seconds. Current RTC: {self.rtc}")
 
+    @_synchronized
     def reset_to_defaults(self):
         self.operation_time = 90
         self.test_time = 120
+        self.zone_operation_times = {}
+        self.max_parallel_actuators = 0
         self.comm_timeout = 120
         self.comm_timeout_enabled = False
+        self._rearm_comm_watchdogs()
         self.auto_test_enabled = False
         self.alarm_history = []
-        for i in range(1, self.zones + 1):
-            self._add_log(i, "Reset to defaults")
+        self._add_log(CONTROLLER_ZONE, "Reset to defaults", 'config')
         print("Reset to defaults.")
 
-    def get_status(self):
+    def _build_status(self):
         status = {
+            'version': self.version,
             'powered': self.powered,
             'mode': self.mode,
-            'damper_positions': self.damper_positions,
-            'alarm_active': self.alarm_active,
-            'smoke_alarms': self.smoke_alarm,
-            'thermal_alarms': self.thermal_alarm,
+            'damper_positions': dict(self.damper_positions),
+            'alarm_active': dict(self.alarm_active),
+            'smoke_alarms': dict(self.smoke_alarm),
+            'thermal_alarms': dict(self.thermal_alarm),
             'external_alarm': self.external_alarm,
             'analog_out': self.analog_out,
             'relay_state': self.relay_state,
@@ -418,12 +930,57 @@ class FDCController:
             'auto_test_enabled': self.auto_test_enabled,
             'next_auto_test': self.next_auto_test.strftime("%Y-%m-%d %H:%M:%S") if self.next_auto_test else None,
             'alarm_history': self.alarm_history,
-            'temp_sensor': self.temp_sensor
+            'alarm_history_repeats': self.alarm_history_repeats,
+            'temp_sensor': dict(self.temp_sensor)
         }
-        return status
+        text = json.dumps(status, indent=2)
+        return (self.version, status, text, text.encode())
+
+    def _status_snapshot(self):
+        cache = self._status_cache
+        if cache is not None and cache[0] == self.version:
+            return cache  # Never mutated once built, so no lock needed
+        with self._lock:
+            cache = self._status_cache
+            if cache is None or cache[0] != self.version:
+                cache = self._status_cache = self._build_status()
+            return cache
+
+    def get_status(self):
+        """
+        Status as a plain dict the caller may keep or change; copied from a snapshot that is only
+        rebuilt when the version has changed since the last call
+        """
+        status = self._status_snapshot()[1]
+        return {k: v.copy() if isinstance(v, (dict, list)) else v for k, v in status.items()}
+
+    def get_status_json(self):
+        """Status serialized as JSON bytes (same text the status command prints)"""
+        return self._status_snapshot()[3]
+
+    def get_status_if_changed(self, since_version):
+        """Returns the status snapshot if the controller changed after since_version, else None"""
+        if since_version == self.version:
+            return None
+        return self.get_status()
+
+    def export_logs(self, file_path, fmt=None):
+        """Streams the event log to a CSV or JSON Lines file; the controller is only locked to fork the log"""
+        from fdc_export import export_records, simulator_records
+        return export_records(simulator_records(self), file_path, fmt)
 
     def save_state(self, file_path):
-        state = {
+        """Writes a sectioned state file: config and status first, the event log in its own section"""
+        with self._lock:
+            state = self._state_dict()
+        # The fork pins the entries logged so far, so they can be serialized after the lock is released
+        events = state.pop('events').to_list()
+        state['event_count'] = len(events)
+        write_sections(file_path, {'config': state, 'events': events})
+
+    def _state_dict(self):
+        """Copy of the persistent state, safe to serialize without the lock (events as an O(1) fork)"""
+        return {
             'model_type': self.model_type,
             'mode': self.mode,
             'zones': self.zones,
@@ -438,8 +995,15 @@ class FDCController:
             'smoke_detector_type': self.smoke_detector_type,
             'operation_time': self.operation_time,
             'test_time': self.test_time,
+            'zone_operation_times': {str(k): v for k, v in self.zone_operation_times.items()},
+            'max_parallel_actuators': self.max_parallel_actuators,
             'comm_timeout': self.comm_timeout,
             'comm_timeout_enabled': self.comm_timeout_enabled,
+            'sim_seconds': self.sim_seconds,
+            'coalesce_window': self.coalesce_window,
+            'comm_clients': dict(self.comm_clients),
+            'comm_lost': sorted(self.comm_lost),
+            'comm_alarm': self.comm_alarm,
             'auto_test_enabled': self.auto_test_enabled,
             'auto_test_interval_hours': self.auto_test_interval_hours,
             'auto_test_hour': self.auto_test_hour,
@@ -447,8 +1011,10 @@ class FDCController:
             'next_auto_test': self.next_auto_test.isoformat() if self.next_auto_test else None,
             'rtc': self.rtc.isoformat(),
             'alarm_history': self.alarm_history,
+            'alarm_history_head': self._history_head,
+            'alarm_history_repeats': self.alarm_history_repeats,
             'dip_sw1': self.dip_sw1,
-            'dip_sw4': self.dip_sw4,
+            'dip_sw4': dict(self.dip_sw4),
             'relay_mode': self.relay_mode,
             'relay_state': self.relay_state,
             'analog_out': self.analog_out,
@@ -457,14 +1023,21 @@ class FDCController:
             'led_status': self.led_status,
             'led_fault': self.led_fault,
             'temp_sensor': {str(k): v for k, v in self.temp_sensor.items()},
-            'logs': {str(k): v for k, v in self.logs.items()}
+            'zone_groups': {name: list(zones) for name, zones in self.zone_groups.items()},
+            'topology': self.topology.to_dict() if self.topology else None,
+            'spread': self.spread.to_list(),
+            'events': self.events.fork()
         }
-        with open(file_path, 'w') as f:
-            json.dump(state, f)
 
+    @_synchronized
     def load_state(self, file_path):
-        with open(file_path, 'r') as f:
-            state = json.load(f)
+        """
+        Loads config and status at once; the event log section is only decoded when logs are
+        first read. Older single-JSON state files are still accepted.
+        """
+        reader, state = read_state(file_path)
+        if reader:
+            state = reader.load('config')
         self.model_type = state['model_type']
         self.mode = state['mode']
         self.zones = state['zones']
@@ -479,28 +1052,94 @@ class FDCController:
         self.smoke_detector_type = state['smoke_detector_type']
         self.operation_time = state['operation_time']
         self.test_time = state['test_time']
+        self.zone_operation_times = {int(k): math.ceil(v) for k, v in state.get('zone_operation_times', {}).items()}
+        self.max_parallel_actuators = state.get('max_parallel_actuators', 0)
+        self.last_test_plan = None
         self.comm_timeout = state['comm_timeout']
         self.comm_timeout_enabled = state['comm_timeout_enabled']
+        self.sim_seconds = math.ceil(state.get('sim_seconds', 0))
+        self.coalesce_window = state.get('coalesce_window', COALESCE_WINDOW)
+        self._alarm_events = {}  # Seqs of the previous event log do not apply to the loaded one
+        self.comm_clients = state.get('comm_clients', {})
+        self.comm_lost = set(state.get('comm_lost', []))
+        self.comm_alarm = state.get('comm_alarm', False)
+        self.comm_wheel = TimerWheel(now=self.sim_seconds)
+        if self.comm_timeout_enabled:
+            for client, last in self.comm_clients.items():
+                if client not in self.comm_lost:
+                    self.comm_wheel.schedule(client, last + self.comm_timeout)
         self.auto_test_enabled = state['auto_test_enabled']
         self.auto_test_interval_hours = state['auto_test_interval_hours']
         self.auto_test_hour = state['auto_test_hour']
         self.auto_test_minute = state['auto_test_minute']
         self.next_auto_test = datetime.datetime.fromisoformat(state['next_auto_test']) if state['next_auto_test'] else None
         self.rtc = datetime.datetime.fromisoformat(state['rtc'])
-        self.alarm_history = state['alarm_history']
         self.dip_sw1 = state['dip_sw1']
         self.dip_sw4 = state['dip_sw4']
         self.relay_mode = state['relay_mode']
         self.relay_state = state['relay_state']
         self.analog_out = state['analog_out']
-        self.modbus_registers = defaultdict(int, state['modbus_registers'])
-        self.bacnet_objects = {k: defaultdict(int, v) for k, v in state['bacnet_objects'].items()}
+        self.modbus_registers = defaultdict(int, {int(k): v for k, v in state['modbus_registers'].items()})
+        self._set_history(state['alarm_history'], state.get('alarm_history_head'), state.get('alarm_history_repeats'))
+        self.bacnet_objects = {k: defaultdict(int, {int(i): x for i, x in v.items()}) for k, v in state['bacnet_objects'].items()}
         self.led_status = state['led_status']
         self.led_fault = state['led_fault']
         self.temp_sensor = {int(k): v for k, v in state['temp_sensor'].items()}
-        self.logs = {int(k): v for k, v in state['logs'].items()}
+        self.zone_groups = {}
+        self._zone_group_index = defaultdict(set)
+        for name, zones in state.get('zone_groups', {}).items():
+            self.zone_groups[name] = zones
+            for zone in zones:
+                self._zone_group_index[zone].add(name)
+        self.topology = Topology.from_dict(state['topology']) if state.get('topology') else None
+        self.spread = SpreadQueue.from_list(state.get('spread', []))
+        if reader:
+            raw = reader.raw('events')
+            saved = LazyEventLog(lambda: EventLog.from_list(json.loads(raw)), state['event_count'])
+            self.events = EventLog(parent=saved)
+        elif 'events' in state:
+            self.events = EventLog.from_list(state['events'])
+        else:
+            self.events = self._events_from_logs({int(k): v for k, v in state['logs'].items()})
+        self._mark_dirty()
+
+    @staticmethod
+    def _events_from_logs(logs):
+        """Builds the event log from plain "[timestamp] message" entries of older state files"""
+        events = EventLog()
+        for zone, entries in logs.items():
+            for entry in entries:
+                stamp, _, message = entry[1:].partition('] ')
+                try:
+                    time = datetime.datetime.strptime(stamp, "%Y-%m-%d %H:%M:%S")
+                except ValueError:
+                    continue
+                events.append(time, zone, 'info', message)
+        return events
+
+    @_synchronized
+    def notify_state_listeners(self):
+        """Tells state listeners (e.g. a shared register map) about changes since the last call"""
+        if self.version != self._notified_version:
+            self._notified_version = self.version
+            for listener in self.state_listeners:
+                listener(self)
 
     def process_command(self, cmd):
+        parts = cmd.split(None, 1)
+        if parts and parts[0] in UNLOCKED_COMMANDS:
+            self._run_command(cmd)  # Changes nothing, so there is nothing to journal or notify
+            return
+        with self._lock:
+            try:
+                started = time.perf_counter()
+                self._run_command(cmd)
+                if self.timetravel:
+                    self.timetravel.record(self, cmd, time.perf_counter() - started)
+            finally:
+                self.notify_state_listeners()
+
+    def _run_command(self, cmd):
         parts = cmd.strip().split()
         if not parts:
             return
@@ -510,26 +1149,105 @@ class FDCController:
             self.power_on()
         elif action == "power_off":
             self.power_off()
-        elif action == "trigger_smoke":
+        elif action in ("trigger_smoke", "trigger_thermal"):
+            # trigger_smoke <zone> | <zones>, where zones is "1-8", "1,3", "@group" or "all"
             if len(parts) > 1:
-                zone = int(parts[1])
-                self.trigger_alarm('smoke', zone)
-        elif action == "trigger_thermal":
+                alarm_type = action[len("trigger_"):]
+                if parts[1].isdigit():
+                    self.trigger_alarm(alarm_type, int(parts[1]))
+                else:
+                    zones = self.resolve_zones(parts[1])
+                    if zones:
+                        self.trigger_alarms(alarm_type, zones)
+                    else:
+                        print(f"No zones match {parts[1]}")
+        elif action == "set_coalesce":
+            # set_coalesce <seconds>; 0 logs every trigger in full
             if len(parts) > 1:
-                zone = int(parts[1])
-                self.trigger_alarm('thermal', zone)
+                self.coalesce_window = float(parts[1])
+                self._mark_dirty()
+                print(f"Alarm coalescing window set to {self.coalesce_window:g} s")
         elif action == "trigger_external":
             self.trigger_alarm('external')
         elif action == "reset_alarms":
-            if len(parts) > 1:
+            if len(parts) > 1 and not parts[1].isdigit():
+                zones = self.resolve_zones(parts[1])
+                if zones:
+                    self.reset_alarms_in(zones)
+                else:
+                    print(f"No zones match {parts[1]}")
+            elif len(parts) > 1:
                 zone = int(parts[1])
                 self.reset_alarms(zone)
             else:
                 self.reset_alarms()
+        elif action == "define_group":
+            # define_group <name> <zones>
+            if len(parts) > 2:
+                self.define_group(parts[1], self.resolve_zones(parts[2]))
+                print(f"Zone group {parts[1]}: {self.zone_groups[parts[1]]}")
+        elif action == "delete_group":
+            if len(parts) > 1:
+                print(f"Zone group {parts[1]} deleted" if self.delete_group(parts[1]) else f"No zone group {parts[1]}")
+        elif action == "groups":
+            print(json.dumps(self.zone_groups, indent=2))
+        elif action == "load_topology":
+            # load_topology <path.json> with {"walls": [[a, b, delay], ...], "ducts": {name: {"zones": [...], "delay": s}}}
+            if len(parts) > 1:
+                self.set_topology(Topology.load(parts[1]))
+                print(f"Topology loaded from {parts[1]}")
+        elif action == "add_wall":
+            # add_wall <a> <b> [delay]
+            if len(parts) > 2:
+                if self.topology is None:
+                    self.set_topology(Topology())
+                delay = int(parts[3]) if len(parts) > 3 else WALL_DELAY
+                self.topology.add_wall(int(parts[1]), int(parts[2]), delay)
+                self._mark_dirty()
+                print(f"Wall between zones {parts[1]} and {parts[2]} ({delay}s)")
+        elif action == "add_duct":
+            # add_duct <name> <zones> [delay]
+            if len(parts) > 2:
+                if self.topology is None:
+                    self.set_topology(Topology())
+                delay = int(parts[3]) if len(parts) > 3 else DUCT_DELAY
+                self.topology.add_duct(parts[1], self.resolve_zones(parts[2]), delay)
+                self._mark_dirty()
+                print(f"Duct {parts[1]}: zones {list(self.topology.ducts[parts[1]][0])} ({delay}s)")
+        elif action == "predict_spread":
+            # predict_spread <zone> [smoke|thermal] [horizon seconds]
+            if len(parts) > 1:
+                alarm_type = parts[2] if len(parts) > 2 else 'smoke'
+                horizon = int(parts[3]) if len(parts) > 3 else 3600
+                print(json.dumps(self.predict_spread(int(parts[1]), alarm_type, horizon), indent=2))
         elif action == "reset_smoke":
             self.reset_smoke_detector()
         elif action == "perform_test":
             self.perform_full_test()
+        elif action == "set_max_parallel":
+            # set_max_parallel <n>; 0 moves every damper at once
+            if len(parts) > 1:
+                self.max_parallel_actuators = max(0, int(parts[1]))
+                self._mark_dirty()
+                print(f"Max parallel actuators set to {self.max_parallel_actuators or 'unlimited'}")
+        elif action == "set_operation_time":
+            # set_operation_time <zones> <seconds>: stroke time of those zones' actuators
+            if len(parts) > 2:
+                zones = self.resolve_zones(parts[1])
+                # Whole seconds: the simulated clock and the comm watchdog's timer wheel count in integers
+                seconds = max(60, min(360, math.ceil(float(parts[2]))))
+                for zone in zones:
+                    self.zone_operation_times[zone] = seconds
+                self._mark_dirty()
+                print(f"Operation time set to {seconds:g} s in zones {zones}")
+        elif action == "test_plan":
+            # test_plan [last]: per-zone timings of the next full test, or of the last one
+            if len(parts) > 1 and parts[1] == 'last':
+                plan = self.last_test_plan
+            else:
+                plan = self.plan_full_test()
+            for line in format_schedule(plan) if plan else ["No full test has run yet"]:
+                print(line)
         elif action == "set_invert":
             if len(parts) > 1:
                 invert = int(parts[1])
@@ -542,12 +1260,21 @@ class FDCController:
             if len(parts) > 2:
                 reg = int(parts[1])
                 value = int(parts[2])
-                self.modbus_write(reg, value)
+                client = parts[3] if len(parts) > 3 else DEFAULT_COMM_CLIENT
+                self.modbus_write(reg, value, client)
         elif action == "modbus_read":
             if len(parts) > 1:
                 reg = int(parts[1])
-                value = self.modbus_read(reg)
+                client = parts[2] if len(parts) > 2 else DEFAULT_COMM_CLIENT
+                value = self.modbus_read(reg, client)
                 print(f"Modbus register {reg}: {value}")
+        elif action == "bacnet_read":
+            if len(parts) > 2:
+                obj_type = parts[1].upper()
+                instance = int(parts[2])
+                client = parts[3] if len(parts) > 3 else DEFAULT_COMM_CLIENT
+                value = self.bacnet_read(obj_type, instance, client)
+                print(f"BACnet {obj_type}{instance}: {value}")
         elif action == "simulate_time":
             if len(parts) > 1:
                 seconds = int(parts[1])
@@ -555,7 +1282,14 @@ class FDCController:
         elif action == "reset_defaults":
             self.reset_to_defaults()
         elif action == "status":
-            print(json.dumps(self.get_status(), indent=2))
+            print(self._status_snapshot()[2])
+        elif action == "status_since":
+            if len(parts) > 1:
+                since = int(parts[1])
+                if self.get_status_if_changed(since) is None:
+                    print(f"Status unchanged (version {since})")
+                else:
+                    print(self._status_snapshot()[2])
         elif action == "enable_auto_test":
             if len(parts) == 4:
                 interval = int(parts[1])
@@ -568,18 +1302,24 @@ class FDCController:
                 self._schedule_next_auto_test()
                 print(f"Auto-test enabled: {interval}h at {hour}:{minute:02d}, next at {self.next_auto_test}")
         elif action == "set_temp":
-            if len(parts) >= 3:
+            if len(parts) >= 3 and not parts[1].isdigit():
+                zones = self.resolve_zones(parts[1])
+                if zones:
+                    self.set_temperatures(zones, float(parts[2]))
+                else:
+                    print(f"No zones match {parts[1]}")
+            elif len(parts) >= 3:
                 zone = int(parts[1])
                 temp = float(parts[2])
                 self.temp_sensor[zone] = temp
-                self._add_log(zone, f"Temperature set to {temp}°C")
+                self._add_log(zone, f"Temperature set to {temp}°C", 'temperature')
                 print(f"Temperature set to {temp}°C in zone {zone}")
                 if temp > 72 and not self.alarm_active[zone]:
                     self.trigger_alarm('thermal', zone)
             elif len(parts) == 2:
                 temp = float(parts[1])
                 self.temp_sensor[1] = temp
-                self._add_log(1, f"Temperature set to {temp}°C")
+                self._add_log(1, f"Temperature set to {temp}°C", 'temperature')
                 print(f"Temperature set to {temp}°C")
                 if temp > 72 and not self.alarm_active[1]:
                     self.trigger_alarm('thermal', 1)
@@ -587,6 +1327,47 @@ class FDCController:
             if len(parts) > 1:
                 zone = int(parts[1])
                 print(json.dumps(self.get_logs(zone), indent=2))
+        elif action == "query_logs":
+            # query_logs [zones=1,2] [since=ISO] [until=ISO] [types=thermal_alarm,smoke_alarm] [limit=N]
+            options = dict(part.split('=', 1) for part in parts[1:] if '=' in part)
+            zones = [int(z) for z in options['zones'].split(',')] if 'zones' in options else None
+            types = options['types'].split(',') if 'types' in options else None
+            limit = int(options['limit']) if 'limit' in options else None
+            print(json.dumps(self.query_logs(zones, options.get('since'), options.get('until'), types, limit), indent=2))
+        elif action == "export_logs":
+            # export_logs <path> [csv|jsonl]; .gz paths are gzip-compressed
+            if len(parts) > 1:
+                fmt = parts[2] if len(parts) > 2 else None
+                count = self.export_logs(parts[1], fmt)
+                print(f"Exported {count} log entries to {parts[1]}")
+        elif action == "trend":
+            # trend -> signals; trend <signal> [start] [end] [buckets] -> [[t, min, max], ...] in sim seconds
+            if self.recorder is None:
+                print("No trend recorder attached")
+            elif len(parts) == 1:
+                print(json.dumps({name: len(self.recorder.series[name]) for name in self.recorder.signals()}, indent=2))
+                print(f"Recorder size: {self.recorder.nbytes()} bytes")
+            elif parts[1] in self.recorder.series:
+                start = float(parts[2]) if len(parts) > 2 else 0
+                end = float(parts[3]) if len(parts) > 3 else self.sim_seconds
+                buckets = int(parts[4]) if len(parts) > 4 else 100
+                print(json.dumps(self.recorder.downsample(parts[1], start, end, buckets)))
+            else:
+                print(f"Unknown trend signal: {parts[1]}")
+        elif action == "seek":
+            # seek <timestamp>: rewind to the first moment the RTC reached it (needs --timetravel)
+            if not self.timetravel:
+                print("Time travel is not enabled")
+            elif len(parts) > 1:
+                from fdc_timetravel import parse_timestamp
+                try:
+                    replayed = self.timetravel.seek(self, parse_timestamp(cmd.strip()[len(action):]))
+                    print(f"Seeked to {self.rtc} ({replayed} commands replayed)")
+                except ValueError as e:
+                    print(f"Seek failed: {e}")
+        elif action == "checkpoints":
+            for line in self.timetravel.describe() if self.timetravel else ["Time travel is not enabled"]:
+                print(line)
         elif action == "save_state":
             if len(parts) > 1:
                 file_path = parts[1]
@@ -603,12 +1384,54 @@ class FDCController:
         else:
             print(f"Unknown command: {cmd}")
 
+def split_request_tag(line):
+    """Splits an optional "@<id>" request tag off a command line, returns (tag, command)"""
+    if line.startswith(REQUEST_TAG):
+        tag, _, cmd = line[len(REQUEST_TAG):].partition(' ')
+        return tag.strip(), cmd
+    return None, line
+
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="FDC controller simulation over stdin/stdout")
+    parser.add_argument('--regmap', metavar='NAME', help="Publish registers to this shared memory segment")
+    parser.add_argument('--regmap-file', metavar='PATH', help="Publish registers to this mmap-backed file")
+    parser.add_argument('--record', metavar='SECONDS', type=float, nargs='?', const=0,
+                        help="Record trend signals on every change, or every SECONDS of simulated time")
+    parser.add_argument('--timetravel', action='store_true', help="Keep checkpoints and a command journal for seek")
+    parser.add_argument('--binary', action='store_true',
+                        help="Speak the framed binary protocol of fdc_binproto.py on stdin/stdout; messages go to stderr")
+    args = parser.parse_args()
+    if args.binary:
+        binary_out = sys.stdout.buffer
+        sys.stdout = sys.stderr  # Nothing printed may land between the frames
     controller = FDCController(model_type='FDC-2KJ', mode='fire', zones=2)
+    controller.alarm_event_log = 'fdc_alarm_events.log'
     save_file = 'fdc_sim_state.json'
     if os.path.exists(save_file):
         controller.load_state(save_file)
+    register_map = None
+    if args.regmap or args.regmap_file:
+        from fdc_regmap import RegisterMap
+        register_map = RegisterMap(name=args.regmap, path=args.regmap_file)
+        register_map.publish(controller)
+        controller.state_listeners.append(register_map.publish)
+    if args.record is not None:
+        from fdc_recorder import Recorder
+        Recorder(interval=args.record or None).attach(controller)
+    if args.timetravel:
+        from fdc_timetravel import TimeTravel
+        TimeTravel().attach(controller)
     print("FDC Controller Simulation started (accelerated mode). Waiting for commands from client...")
-    for line in sys.stdin:
-        controller.process_command(line)
-    controller.save_state(save_file)
\ No newline at end of file
+    if args.binary:
+        from fdc_binproto import serve_stream
+        serve_stream(controller, sys.stdin.buffer, binary_out)
+    else:
+        for line in sys.stdin:
+            tag, cmd = split_request_tag(line)
+            controller.process_command(cmd)
+            if tag is not None:
+                print(f"{REQUEST_TAG}{tag} done", flush=True)
+    controller.save_state(save_file)
+    if register_map:
+        register_map.close()
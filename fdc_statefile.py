@@ -0,0 +1,73 @@
+# fdc_statefile.py
+# Sectioned state files: a one-line JSON header with the offset and length of each section, then the sections.
+import json
+
+FORMAT = 'fdc-sections'
+VERSION = 1
+
+def write_sections(path, sections):
+    """
+    Writes {name: value} where value is either already-encoded JSON bytes (e.g. a section
+    carried over from a file that was never decoded) or any JSON-serializable object.
+    """
+    bodies = []
+    index = {}
+    offset = 0
+    for name, value in sections.items():
+        body = value if isinstance(value, bytes) else json.dumps(value).encode('utf-8')
+        index[name] = [offset, len(body)]
+        bodies.append(body)
+        offset += len(body)
+    header = json.dumps({'format': FORMAT, 'version': VERSION, 'sections': index}).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(header + b'\n')
+        for body in bodies:
+            f.write(body)
+
+class SectionReader:
+    """Raw bytes of a sectioned file, held in memory so sections can be decoded later even if the file is rewritten"""
+
+    def __init__(self, data, index, start):
+        self._data = data
+        self._index = index
+        self._start = start
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def names(self):
+        return list(self._index)
+
+    def raw(self, name):
+        offset, length = self._index[name]
+        return self._data[self._start + offset:self._start + offset + length]
+
+    def load(self, name, default=None):
+        return json.loads(self.raw(name)) if name in self._index else default
+
+def read_state(path):
+    """
+    Returns a SectionReader for a sectioned file, or None with the decoded document for an
+    older single-JSON state file: (reader, None) or (None, state).
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    newline = data.find(b'\n')
+    if newline > 0:
+        try:
+            header = json.loads(data[:newline])
+        except ValueError:
+            header = None
+        if isinstance(header, dict) and header.get('format') == FORMAT:
+            return SectionReader(data, header['sections'], newline + 1), None
+    return None, json.loads(data)
+
+def extend_json_list(raw, items):
+    """Encoded JSON list raw followed by items, without decoding raw"""
+    if not items:
+        return raw
+    tail = json.dumps(items).encode('utf-8')
+    head = raw.rstrip()
+    if head == b'[]':
+        return tail
+    return head[:-1] + b', ' + tail[1:]
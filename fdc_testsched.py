@@ -0,0 +1,99 @@
+# fdc_testsched.py
+# Staggered full-test planning: packs zones onto a limited number of actuators moving at once.
+import heapq
+
+EXACT_LIMIT = 16  # Zone counts up to this are packed exactly (branch and bound); larger ones use LPT
+SEARCH_LIMIT = 200000  # Branch-and-bound nodes before settling for the best packing found
+STROKES = (('closed', "Full test started: Damper closed"),
+           ('open', "Full test: Damper opened"),
+           ('closed', "Full test: Damper closed again"))
+
+def _lpt(durations, lanes):
+    """Longest processing time first: each zone goes to the least loaded lane"""
+    heap = [(0, lane) for lane in range(lanes)]
+    assignment = [[] for _ in range(lanes)]
+    for zone, seconds in sorted(durations.items(), key=lambda item: (-item[1], item[0])):
+        load, lane = heapq.heappop(heap)
+        assignment[lane].append(zone)
+        heapq.heappush(heap, (load + seconds, lane))
+    return max(load for load, _ in heap), assignment
+
+def _exact(durations, lanes, best, best_assignment):
+    """Branch and bound over lane assignments, longest zones first; stops at the lower bound"""
+    zones = sorted(durations, key=lambda zone: (-durations[zone], zone))
+    total = sum(durations.values())
+    share = -(-total // lanes) if isinstance(total, int) else total / lanes
+    bound = max(max(durations.values()), share)
+    loads = [0] * lanes
+    assignment = [[] for _ in range(lanes)]
+    nodes = 0
+
+    def search(i):
+        nonlocal best, best_assignment, nodes
+        if best <= bound or nodes >= SEARCH_LIMIT:
+            return
+        nodes += 1
+        if i == len(zones):
+            best = max(loads)
+            best_assignment = [list(lane) for lane in assignment]
+            return
+        seconds = durations[zones[i]]
+        tried = set()
+        for lane in range(lanes):
+            # Lanes with equal loads are interchangeable, so only one of them is tried
+            if loads[lane] in tried or loads[lane] + seconds >= best:
+                continue
+            tried.add(loads[lane])
+            loads[lane] += seconds
+            assignment[lane].append(zones[i])
+            search(i + 1)
+            assignment[lane].pop()
+            loads[lane] -= seconds
+
+    search(0)
+    return best, best_assignment
+
+def pack(durations, lanes):
+    """
+    Assigns {zone: seconds} to at most lanes actuator lanes so the longest lane is as short as
+    possible. Returns (longest lane in seconds, [zones of each non-empty lane in run order]).
+    """
+    if not durations:
+        return 0, []
+    lanes = min(lanes, len(durations)) if lanes else len(durations)
+    makespan, assignment = _lpt(durations, lanes)
+    if len(durations) <= EXACT_LIMIT:
+        makespan, assignment = _exact(durations, lanes, makespan, assignment)
+    return makespan, [lane for lane in assignment if lane]
+
+def schedule(durations, max_parallel=0):
+    """
+    Plans a full test of the zones in durations ({zone: seconds per damper stroke}) with at most
+    max_parallel dampers moving at once (0 = no limit). The test is three passes (close, open,
+    close again); in each pass the zones of a lane move back to back and the lanes run side by
+    side, so a pass takes as long as the longest lane and the test three times that. Splitting
+    a zone's strokes across passes costs nothing: any plan of whole zone tests needs 3x the
+    best single-pass packing as well.
+    Returns {'pass_time', 'makespan', 'lanes', 'zones': {zone: {'lane', 'strokes':
+    [(position, message, start, end)]}}} with times in seconds from the start of the test.
+    """
+    pass_time, lanes = pack(durations, max_parallel)
+    zones = {}
+    for lane, lane_zones in enumerate(lanes, 1):
+        offset = 0
+        for zone in lane_zones:
+            seconds = durations[zone]
+            strokes = [(position, message, n * pass_time + offset, n * pass_time + offset + seconds)
+                       for n, (position, message) in enumerate(STROKES)]
+            zones[zone] = {'lane': lane, 'strokes': strokes}
+            offset += seconds
+    return {'pass_time': pass_time, 'makespan': pass_time * len(STROKES), 'lanes': len(lanes), 'zones': zones}
+
+def format_schedule(plan):
+    """Printable lines: the totals, then each zone's lane and stroke windows"""
+    lines = [f"Test plan: {len(plan['zones'])} zones on {plan['lanes']} lanes, "
+             f"{plan['pass_time']:g} s per pass, {plan['makespan']:g} s total"]
+    for zone, timing in sorted(plan['zones'].items()):
+        windows = ', '.join(f"{position} {start:g}-{end:g} s" for position, _, start, end in timing['strokes'])
+        lines.append(f"  Zone {zone}: lane {timing['lane']}, {windows}")
+    return lines
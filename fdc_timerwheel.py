@@ -0,0 +1,143 @@
+# fdc_timerwheel.py
+
+BITS = 6
+SLOTS = 1 << BITS
+MASK = SLOTS - 1
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel over integer ticks (simulated seconds).
+    Level l has 64 slots, each 64**l ticks wide; deadlines past the top level wait in an overflow map.
+    schedule() (arm or re-arm) and cancel() are O(1). advance() cascades timers down a level as their
+    slot comes due and jumps straight over stretches where the lower levels are empty.
+    """
+
+    def __init__(self, levels=4, now=0):
+        self.levels = levels
+        self.now = now
+        self._wheels = [[{} for _ in range(SLOTS)] for _ in range(levels)]
+        self._counts = [0] * levels
+        self._overflow = {}
+        self._due = {}
+        self._where = {}  # key -> (level, slot); level is 'due' or 'overflow' outside the wheels
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key):
+        return key in self._where
+
+    def schedule(self, key, deadline):
+        """Arms key to expire at tick deadline, replacing any earlier deadline for it"""
+        self.cancel(key)
+        self._place(key, deadline)
+
+    def _place(self, key, deadline):
+        if deadline <= self.now:
+            self._due[key] = deadline
+            self._where[key] = ('due', None)
+            return
+        for level in range(self.levels):
+            shift = BITS * (level + 1)
+            if deadline >> shift == self.now >> shift:
+                slot = (deadline >> (BITS * level)) & MASK
+                self._wheels[level][slot][key] = deadline
+                self._counts[level] += 1
+                self._where[key] = (level, slot)
+                return
+        self._overflow[key] = deadline
+        self._where[key] = ('overflow', None)
+
+    def cancel(self, key):
+        where = self._where.pop(key, None)
+        if where is None:
+            return False
+        level, slot = where
+        if level == 'due':
+            del self._due[key]
+        elif level == 'overflow':
+            del self._overflow[key]
+        else:
+            del self._wheels[level][slot][key]
+            self._counts[level] -= 1
+        return True
+
+    def clear(self):
+        for key in list(self._where):
+            self.cancel(key)
+
+    def advance(self, to):
+        """Moves the wheel to tick `to`; returns [(key, deadline)] of expired timers in deadline order"""
+        expired = []
+        self._drain_due(expired)
+        while self.now < to:
+            if not self._where:
+                self.now = to
+                break
+            level = 0
+            while level < self.levels and self._counts[level] == 0:
+                level += 1
+            if level == 0:
+                self.now += 1
+            else:
+                # Nothing can fire before the next boundary of the first non-empty level (or the overflow)
+                span = 1 << (BITS * level)
+                boundary = (self.now // span + 1) * span
+                if level == self.levels:
+                    # Only overflow timers left: go to the top-level boundary of the earliest one
+                    boundary = max(boundary, min(self._overflow.values()) // span * span)
+                if boundary > to:
+                    self.now = to
+                    break
+                self.now = boundary
+            self._tick(expired)
+        return expired
+
+    def _tick(self, expired):
+        now = self.now
+        if self._overflow and now & ((1 << (BITS * self.levels)) - 1) == 0:
+            pending, self._overflow = self._overflow, {}
+            for key, deadline in pending.items():
+                del self._where[key]
+                self._place(key, deadline)
+        for level in range(self.levels - 1, 0, -1):
+            if now & ((1 << (BITS * level)) - 1) == 0:
+                slot = (now >> (BITS * level)) & MASK
+                bucket = self._wheels[level][slot]
+                if bucket:
+                    self._wheels[level][slot] = {}
+                    self._counts[level] -= len(bucket)
+                    for key, deadline in bucket.items():
+                        del self._where[key]
+                        self._place(key, deadline)
+        bucket = self._wheels[0][now & MASK]
+        if bucket:
+            self._wheels[0][now & MASK] = {}
+            self._counts[0] -= len(bucket)
+            for key, deadline in bucket.items():
+                del self._where[key]
+                expired.append((key, deadline))
+        self._drain_due(expired)
+
+    def _drain_due(self, expired):
+        if self._due:
+            for key, deadline in sorted(self._due.items(), key=lambda item: item[1]):
+                del self._where[key]
+                expired.append((key, deadline))
+            self._due = {}
+
+    def timers(self):
+        """All armed (key, deadline) pairs"""
+        for key, (level, slot) in self._where.items():
+            if level == 'due':
+                yield key, self._due[key]
+            elif level == 'overflow':
+                yield key, self._overflow[key]
+            else:
+                yield key, self._wheels[level][slot][key]
+
+    def copy(self):
+        other = TimerWheel(self.levels, self.now)
+        for key, deadline in self.timers():
+            other._place(key, deadline)
+        return other
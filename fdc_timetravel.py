@@ -0,0 +1,186 @@
+# fdc_timetravel.py
+# In-memory checkpoints and a command journal, so a simulator run can be rewound to any RTC.
+import bisect
+import contextlib
+import datetime
+import io
+import time
+
+MAX_CHECKPOINTS = 256  # Beyond this the older half is thinned to every other checkpoint
+MAX_JOURNAL = 200000  # Journaled commands kept; the oldest checkpoints go once this is exceeded
+REPLAY_BUDGET = 0.05  # Seconds of command work between checkpoints, which bounds a seek's replay
+CHECKPOINT_OVERHEAD = 0.1  # Checkpoints may cost at most this fraction of the command work between them
+MAX_FORK_DEPTH = 32  # Each seek nests the event log two forks deeper; beyond this it is flattened
+# Commands that change nothing (or only write files) are neither journaled nor replayed
+PASSIVE_COMMANDS = frozenset(['status', 'status_since', 'get_logs', 'query_logs', 'trend', 'groups', 'test_plan',
+                              'predict_spread', 'save_state', 'export_logs', 'seek', 'checkpoints', 'exit'])
+# Commands whose effect depends on something outside the journal; a checkpoint is taken right after them
+BARRIER_COMMANDS = frozenset(['load_state', 'load_topology'])
+# Live controller attributes a restore keeps: its lock, listeners and attachments
+KEEP_ATTRIBUTES = frozenset(['_lock', 'log_listeners', 'state_listeners', 'recorder', 'alarm_event_log',
+                             'timetravel', 'version', '_notified_version'])
+
+class Checkpoint:
+    __slots__ = ('position', 'rtc', 'controller', 'pinned')
+
+    def __init__(self, position, rtc, controller, pinned=False):
+        self.position = position  # Journal position the snapshot was taken at
+        self.rtc = rtc
+        self.controller = controller  # FDCController.clone(); its event log is a fork, so history is shared
+        self.pinned = pinned  # Taken after a barrier command, which replay cannot repeat; never thinned
+
+class TimeTravel:
+    """
+    Time travel for a simulator FDCController. Every command run through process_command is
+    journaled with the running maximum of the RTC after it. Checkpoints are clones taken once
+    enough command work has built up since the last one: REPLAY_BUDGET seconds, or more if
+    cloning is slow. When there are too many checkpoints, the older ones are thinned, so recent
+    history stays dense and old history sparse. seek() restores the last checkpoint before the
+    target RTC, replays the journal on a copy and splits the simulate_time step that crosses
+    the target. The result is copied into the live controller, whose listeners stay attached.
+    Commands sent by calling controller methods directly (e.g. the binary protocol) are not
+    journaled; a seek across them loses their effect.
+    """
+
+    def __init__(self, max_checkpoints=MAX_CHECKPOINTS, max_journal=MAX_JOURNAL, replay_budget=REPLAY_BUDGET):
+        self.max_checkpoints = max_checkpoints
+        self.max_journal = max_journal
+        self.replay_budget = replay_budget
+        self.checkpoints = []
+        self._commands = []
+        self._max_rtc = []  # Running maximum of the RTC after each journaled command, for bisect
+        self._base = 0  # Journal position of self._commands[0]
+        self._work = 0.0  # Command seconds since the last checkpoint
+        self._clone_cost = 0.0
+
+    def attach(self, controller):
+        controller.timetravel = self
+        self.checkpoint(controller)
+
+    @property
+    def position(self):
+        return self._base + len(self._commands)
+
+    def checkpoint(self, controller, pinned=False):
+        started = time.perf_counter()
+        self.checkpoints.append(Checkpoint(self.position, controller.rtc, controller.clone(), pinned))
+        self._clone_cost = time.perf_counter() - started
+        self._work = 0.0
+        if len(self.checkpoints) > self.max_checkpoints:
+            self._thin()
+
+    def _thin(self):
+        """Drops every other checkpoint in the older half; the oldest and pinned ones are always kept"""
+        keep = self.max_checkpoints // 2
+        older, recent = self.checkpoints[:-keep], self.checkpoints[-keep:]
+        self.checkpoints = [c for n, c in enumerate(older) if n % 2 == 0 or c.pinned] + recent
+
+    def record(self, controller, cmd, elapsed):
+        """Journals a command process_command just ran, taking elapsed seconds"""
+        parts = cmd.split(None, 1)
+        if not parts or parts[0] in PASSIVE_COMMANDS:
+            return
+        rtc = controller.rtc
+        if self._max_rtc and self._max_rtc[-1] > rtc:
+            rtc = self._max_rtc[-1]
+        self._commands.append(cmd.strip())
+        self._max_rtc.append(rtc)
+        self._work += elapsed
+        if parts[0] in BARRIER_COMMANDS:
+            self.checkpoint(controller, pinned=True)
+        elif self._work >= self._checkpoint_work():
+            self.checkpoint(controller)
+        if len(self._commands) > self.max_journal:
+            self._trim(controller)
+
+    def _checkpoint_work(self):
+        """Command seconds after which the next checkpoint is taken"""
+        return max(self.replay_budget, self._clone_cost / CHECKPOINT_OVERHEAD)
+
+    def _trim(self, controller):
+        """Forgets the oldest checkpoints, and the commands before the new oldest, until the journal fits"""
+        if len(self.checkpoints) == 1:
+            self.checkpoint(controller)
+        while len(self._commands) > self.max_journal and len(self.checkpoints) > 1:
+            self.checkpoints.pop(0)
+            drop = self.checkpoints[0].position - self._base
+            del self._commands[:drop]
+            del self._max_rtc[:drop]
+            self._base += drop
+
+    def earliest(self):
+        return self.checkpoints[0].rtc
+
+    def seek(self, controller, target):
+        """
+        Rewinds controller to the first moment its RTC reached target, which must lie between the
+        oldest checkpoint and now. Returns the number of commands replayed.
+        """
+        if target < self.earliest():
+            raise ValueError(f"Cannot seek before {self.earliest()}")
+        # The first command after which the RTC had gone past target
+        crossing = self._base + bisect.bisect_right(self._max_rtc, target)
+        if crossing == self.position:
+            raise ValueError(f"Cannot seek past the current RTC {controller.rtc}")
+        i = bisect.bisect_right([c.position for c in self.checkpoints], crossing) - 1
+        start = self.checkpoints[i]
+        sim = start.controller.clone()
+        replay = self._commands[start.position - self._base:crossing - self._base]
+        partial = None
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for cmd in replay:
+                sim._run_command(cmd)
+            # Only a time step can be split; any other command that jumps the RTC is left out
+            parts = self._commands[crossing - self._base].split()
+            seconds = int((target - sim.rtc).total_seconds())
+            if parts[0] == 'simulate_time' and seconds > 0:
+                partial = f"simulate_time {seconds}"
+                sim._run_command(partial)
+        self._restore(controller, sim)
+        # The rewound point is the new present: later commands and checkpoints belong to the abandoned timeline
+        del self._commands[crossing - self._base:]
+        del self._max_rtc[crossing - self._base:]
+        self.checkpoints = self.checkpoints[:i + 1]
+        # The replay is work since checkpoint i too: once it is worth a checkpoint one is taken here,
+        # or seeks that keep rewinding past the newest checkpoint would replay ever longer
+        self._work = 0.0
+        elapsed = time.perf_counter() - started
+        if partial:
+            self.record(controller, partial, elapsed)
+        else:
+            self._work = elapsed
+            if self._work >= self._checkpoint_work():
+                self.checkpoint(controller)
+        return len(replay) + bool(partial)
+
+    @staticmethod
+    def _restore(controller, sim):
+        """
+        Moves the replayed clone's state into the live controller object. Its event log is a fork
+        of a checkpoint's fork, so every seek deepens the chain lookups walk; once that passes
+        MAX_FORK_DEPTH it is flattened. The trend recorder forgets what it sampled after the
+        rewound point.
+        """
+        version = controller.version
+        for name, value in vars(sim).items():
+            if name not in KEEP_ATTRIBUTES:
+                setattr(controller, name, value)
+        if sim.events.depth > MAX_FORK_DEPTH:
+            controller.events = sim.events.flatten()
+        controller.version = version
+        controller._mark_dirty()
+        controller._status_cache = None
+        if controller.recorder:
+            controller.recorder.rewind(controller)
+
+    def describe(self):
+        lines = [f"{len(self.checkpoints)} checkpoints, {len(self._commands)} journaled commands, "
+                 f"next checkpoint after {self._checkpoint_work() * 1000:.0f} ms of work"]
+        if self.checkpoints:
+            lines.append(f"Seekable from {self.earliest()} to the current RTC")
+        return lines
+
+def parse_timestamp(text):
+    """ISO timestamp, with a space or a T between date and time"""
+    return datetime.datetime.fromisoformat(text.strip().replace(' ', 'T', 1))
@@ -0,0 +1,121 @@
+# fdc_topology.py
+import heapq
+import json
+from collections import defaultdict
+
+WALL_DELAY = 120  # Seconds for smoke or heat to get through a wall into the adjacent zone
+DUCT_DELAY = 15  # Seconds for smoke to travel along a shared duct
+SPREAD_TEMP = 75.0  # Temperature a zone reaches when heat spreads into it (above the 72°C thermal limit)
+
+class Topology:
+    """
+    Building graph: walls between adjacent zones and ducts shared by several zones,
+    each with the delay in seconds it takes smoke (or, through walls, heat) to cross.
+    """
+
+    def __init__(self):
+        self.walls = defaultdict(dict)  # zone -> {neighbor: delay}
+        self.ducts = {}  # name -> (zones, delay)
+        self._zone_ducts = defaultdict(list)  # zone -> names of the ducts it is connected to
+
+    def add_wall(self, a, b, delay=WALL_DELAY):
+        self.walls[a][b] = delay
+        self.walls[b][a] = delay
+
+    def add_duct(self, name, zones, delay=DUCT_DELAY):
+        self.remove_duct(name)
+        zones = tuple(sorted(set(zones)))
+        self.ducts[name] = (zones, delay)
+        for zone in zones:
+            self._zone_ducts[zone].append(name)
+
+    def remove_duct(self, name):
+        zones, _ = self.ducts.pop(name, ((), None))
+        for zone in zones:
+            self._zone_ducts[zone].remove(name)
+
+    def wall_neighbors(self, zone):
+        """(neighbor, delay) pairs"""
+        return self.walls.get(zone, {}).items()
+
+    def duct_neighbors(self, zone):
+        """(neighbor, delay, duct) for every other zone on a duct shared with zone"""
+        for name in self._zone_ducts.get(zone, ()):
+            zones, delay = self.ducts[name]
+            for neighbor in zones:
+                if neighbor != zone:
+                    yield neighbor, delay, name
+
+    def copy(self):
+        other = Topology()
+        other.walls = defaultdict(dict, {zone: dict(neighbors) for zone, neighbors in self.walls.items()})
+        other.ducts = dict(self.ducts)
+        other._zone_ducts = defaultdict(list, {zone: list(names) for zone, names in self._zone_ducts.items()})
+        return other
+
+    def to_dict(self):
+        walls = [[a, b, delay] for a, neighbors in self.walls.items() for b, delay in neighbors.items() if a < b]
+        ducts = {name: {'zones': list(zones), 'delay': delay} for name, (zones, delay) in self.ducts.items()}
+        return {'walls': walls, 'ducts': ducts}
+
+    @classmethod
+    def from_dict(cls, data):
+        topology = cls()
+        for wall in data.get('walls', []):
+            topology.add_wall(*wall)
+        for name, duct in data.get('ducts', {}).items():
+            topology.add_duct(name, duct['zones'], duct.get('delay', DUCT_DELAY))
+        return topology
+
+    @classmethod
+    def load(cls, path):
+        """Reads {"walls": [[a, b, delay?], ...], "ducts": {name: {"zones": [...], "delay": s}}}"""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+class SpreadQueue:
+    """
+    Frontier of pending spread events ordered by simulated time: (due, zone, kind, source, duct).
+    kind is 'smoke' or 'heat'; duct is None for spread through a wall.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = 0  # Tie-breaker keeping equal-time events in scheduling order
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, due, zone, kind, source, duct=None):
+        heapq.heappush(self._heap, (due, self._seq, zone, kind, source, duct))
+        self._seq += 1
+
+    def next_due(self):
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, due):
+        """All events due exactly at due, in scheduling order"""
+        events = []
+        while self._heap and self._heap[0][0] == due:
+            entry = heapq.heappop(self._heap)
+            events.append((entry[0],) + entry[2:])
+        return events
+
+    def clear(self):
+        self._heap = []
+
+    def copy(self):
+        other = SpreadQueue()
+        other._heap = list(self._heap)
+        other._seq = self._seq
+        return other
+
+    def to_list(self):
+        return [[due, zone, kind, source, duct] for due, _, zone, kind, source, duct in sorted(self._heap)]
+
+    @classmethod
+    def from_list(cls, items):
+        queue = cls()
+        for due, zone, kind, source, duct in items:
+            queue.push(due, zone, kind, source, duct)
+        return queue